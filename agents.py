@@ -7,15 +7,61 @@ This module contains three specialized agents:
 3. HealthCoachAgent - Personalized coaching and behavior change support
 """
 
-from api_client import call_gemini
+from api_client import call_gemini, create_cached_context, hash_system_prompt
 from prompts import (
     get_agent_prompt,
     DS_CODE_GENERATION_PROMPT,
     HC_RECOMMENDATION_PROMPT,
     render_prompt
 )
-import json
-from typing import Dict, Any, Optional, List
+from json_utils import dumps_pretty
+from collections import deque
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Dict, Any, Optional, List, Deque
+
+
+# Static skeletons for the inline user prompts, split around their insertion
+# points so each call only joins the pieces instead of rebuilding the text
+_DS_PLAN_TMPL = (
+    "Analyze this user query and create a detailed analysis plan.\n\nUser Query: ",
+    "\n\nCreate a Discussion section analyzing feasibility and operationalizing any vague terms, "
+    "followed by an Approach section with numbered steps for the analysis.",
+)
+
+_DE_ANSWER_TMPL = (
+    "Answer this health question with medical accuracy and personalization.\n\nUser Question: ",
+    "\n\nUser Health Profile:\n",
+    "\n\nRecent Wearable Data:\n",
+    "\n\nProvide a comprehensive answer that addresses the question, incorporates the user's personal "
+    "context, and suggests actionable insights if appropriate.",
+)
+
+_DE_SYNTHESIS_TMPL = (
+    "Synthesize insights from multiple health data sources to answer this query.\n\nUser Query: ",
+    "\n\nHealth Records:\n",
+    "\n\nWearable Data Summary:\n",
+    "\n\nLab Results:\n",
+    "\n\nData Science Analysis:\n",
+    "\n\nProvide a comprehensive medical interpretation that integrates all available data sources.",
+)
+
+_HC_GOALS_TMPL = (
+    "Engage with the user to identify their health goals and motivations.\n\nConversation History:\n",
+    "\n\nUser's Latest Message: ",
+    "\n\nAvailable Health Insights: ",
+    "\n\nUse open-ended questions to explore deeper motivations, reflect back what you're hearing, "
+    "and identify specific, measurable goals.",
+)
+
+_HC_FEEDBACK_TMPL = (
+    "Process the user's feedback on your previous recommendation and adjust your coaching approach."
+    "\n\nConversation History:\n",
+    "\n\nPrevious Recommendation:\n",
+    "\n\nUser's Feedback:\n",
+    "\n\nAcknowledge their feedback, adjust your approach based on their response, and provide revised "
+    "guidance that better fits their needs and preferences.",
+)
 
 
 class DataScienceAgent:
@@ -35,7 +81,39 @@ class DataScienceAgent:
             personal_data: Dictionary containing user's wearable and health data
         """
         self.personal_data = personal_data
-        self.system_prompt = get_agent_prompt('DS', personal_data=json.dumps(personal_data, indent=2))
+        self.refresh_data_summary()
+
+    def refresh_data_summary(self):
+        """
+        Rebuild the data summary and variable descriptions used in prompts.
+
+        Both are derived from personal_data once rather than on every call; call this
+        again if personal_data is modified in place. The system prompt, which embeds
+        personal_data, is rendered again on its next use.
+        """
+        self._data_summary_str = self._build_data_summary()
+        self._data_variables_str = self._build_data_variables()
+        self._reset_system_prompt()
+
+    @cached_property
+    def system_prompt(self) -> str:
+        """System prompt embedding the full personal data, rendered on first use."""
+        return get_agent_prompt('DS', personal_data=dumps_pretty(self.personal_data))
+
+    @property
+    def _cached_content(self):
+        """Server-side context cache for the system prompt, re-registered as it expires."""
+        return create_cached_context(self.system_prompt, system_prompt_hash=self._system_prompt_hash)
+
+    @cached_property
+    def _system_prompt_hash(self) -> bytes:
+        """Response-cache digest of the system prompt, computed once per context."""
+        return hash_system_prompt(self.system_prompt)
+
+    def _reset_system_prompt(self):
+        """Drop the rendered system prompt and its digest so the next call renders them anew."""
+        for name in ('system_prompt', '_system_prompt_hash'):
+            self.__dict__.pop(name, None)
 
     def generate_analysis_plan(self, user_query: str, data_summary: Optional[str] = None) -> str:
         """
@@ -51,14 +129,12 @@ class DataScienceAgent:
         if data_summary is None:
             data_summary = self._summarize_available_data()
 
-        user_prompt = f"""Analyze this user query and create a detailed analysis plan.
-
-User Query: {user_query}
-
-Create a Discussion section analyzing feasibility and operationalizing any vague terms, followed by an Approach section with numbered steps for the analysis."""
+        user_prompt = "".join((_DS_PLAN_TMPL[0], user_query, _DS_PLAN_TMPL[1]))
 
         response = call_gemini(
             system_prompt=self.system_prompt,
+            cached_content=self._cached_content,
+            system_prompt_hash=self._system_prompt_hash,
             user_prompt=user_prompt,
             temperature=0.3  # Lower temperature for more structured planning
         )
@@ -87,6 +163,8 @@ Create a Discussion section analyzing feasibility and operationalizing any vague
 
         response = call_gemini(
             system_prompt=self.system_prompt,
+            cached_content=self._cached_content,
+            system_prompt_hash=self._system_prompt_hash,
             user_prompt=user_prompt,
             temperature=0.2  # Very low temperature for code generation
         )
@@ -117,6 +195,14 @@ Create a Discussion section analyzing feasibility and operationalizing any vague
         }
 
     def _summarize_available_data(self) -> str:
+        """Return the summary of available data for prompt context."""
+        return self._data_summary_str
+
+    def _get_data_variables(self) -> str:
+        """Return the description of available data variables for code generation."""
+        return self._data_variables_str
+
+    def _build_data_summary(self) -> str:
         """Generate a summary of available data for prompt context."""
         summary_parts = []
 
@@ -132,8 +218,8 @@ Create a Discussion section analyzing feasibility and operationalizing any vague
 
         return "\n".join(summary_parts)
 
-    def _get_data_variables(self) -> str:
-        """Get a description of available data variables for code generation."""
+    def _build_data_variables(self) -> str:
+        """Generate a description of available data variables for code generation."""
         variables = []
 
         if 'wearable_data' in self.personal_data:
@@ -162,11 +248,47 @@ class DomainExpertAgent:
             user_health_context: User's health profile, records, and context
         """
         self.user_health_context = user_health_context
-        self.system_prompt = get_agent_prompt(
+
+    @cached_property
+    def system_prompt(self) -> str:
+        """System prompt embedding the health context, rendered on first use."""
+        return get_agent_prompt(
             'DE',
-            user_health_context=json.dumps(user_health_context, indent=2)
+            user_health_context=dumps_pretty(self.user_health_context)
         )
 
+    @property
+    def _cached_content(self):
+        """Server-side context cache for the system prompt, re-registered as it expires."""
+        return create_cached_context(self.system_prompt, system_prompt_hash=self._system_prompt_hash)
+
+    @cached_property
+    def _system_prompt_hash(self) -> bytes:
+        """Response-cache digest of the system prompt, computed once per context."""
+        return hash_system_prompt(self.system_prompt)
+
+    def _reset_system_prompt(self):
+        """Drop the rendered system prompt and its digest so the next call renders them anew."""
+        for name in ('system_prompt', '_system_prompt_hash'):
+            self.__dict__.pop(name, None)
+
+    @property
+    def user_health_context(self) -> Dict[str, Any]:
+        """User's health profile, records, and context."""
+        return self._user_health_context
+
+    @user_health_context.setter
+    def user_health_context(self, value: Dict[str, Any]):
+        # The serialized sections are interpolated into every prompt, so render them
+        # once here rather than on each call
+        self._user_health_context = value
+        wearable_data = value.get('wearable_data', {})
+        self._health_profile_json = dumps_pretty(value.get('health_profile', {}))
+        self._health_records_json = dumps_pretty(value.get('health_records', {}))
+        self._wearable_json = dumps_pretty(wearable_data) if wearable_data else "No wearable data available"
+        # The system prompt embeds the context too
+        self._reset_system_prompt()
+
     def answer_health_question(
         self,
         user_question: str,
@@ -185,26 +307,21 @@ class DomainExpertAgent:
         health_profile = self._format_health_profile()
         wearable_summary = self._format_wearable_data(wearable_data) if wearable_data else "No recent data"
 
-        user_prompt = f"""Answer this health question with medical accuracy and personalization.
-
-User Question: {user_question}
-
-User Health Profile:
-{health_profile}
-
-Recent Wearable Data:
-{wearable_summary}
-
-Provide a comprehensive answer that addresses the question, incorporates the user's personal context, and suggests actionable insights if appropriate."""
+        user_prompt = "".join((
+            _DE_ANSWER_TMPL[0], user_question,
+            _DE_ANSWER_TMPL[1], health_profile,
+            _DE_ANSWER_TMPL[2], wearable_summary,
+            _DE_ANSWER_TMPL[3]
+        ))
 
-        response = call_gemini(
+        return call_gemini(
             system_prompt=self.system_prompt,
+            cached_content=self._cached_content,
+            system_prompt_hash=self._system_prompt_hash,
             user_prompt=user_prompt,
             temperature=0.4
         )
 
-        return response
-
     def synthesize_insights(
         self,
         user_query: str,
@@ -222,29 +339,19 @@ Provide a comprehensive answer that addresses the question, incorporates the use
         Returns:
             Synthesized insights as a string
         """
-        health_records = self.user_health_context.get('health_records', {})
-        wearable_data = self.user_health_context.get('wearable_data', {})
-
-        user_prompt = f"""Synthesize insights from multiple health data sources to answer this query.
-
-User Query: {user_query}
-
-Health Records:
-{json.dumps(health_records, indent=2)}
-
-Wearable Data Summary:
-{json.dumps(wearable_data, indent=2) if wearable_data else "No wearable data available"}
-
-Lab Results:
-{json.dumps(lab_results, indent=2) if lab_results else "No recent lab results"}
-
-Data Science Analysis:
-{ds_analysis or "No statistical analysis available"}
-
-Provide a comprehensive medical interpretation that integrates all available data sources."""
+        user_prompt = "".join((
+            _DE_SYNTHESIS_TMPL[0], user_query,
+            _DE_SYNTHESIS_TMPL[1], self._health_records_json,
+            _DE_SYNTHESIS_TMPL[2], self._wearable_json,
+            _DE_SYNTHESIS_TMPL[3], dumps_pretty(lab_results) if lab_results else "No recent lab results",
+            _DE_SYNTHESIS_TMPL[4], ds_analysis or "No statistical analysis available",
+            _DE_SYNTHESIS_TMPL[5]
+        ))
 
         response = call_gemini(
             system_prompt=self.system_prompt,
+            cached_content=self._cached_content,
+            system_prompt_hash=self._system_prompt_hash,
             user_prompt=user_prompt,
             temperature=0.5
         )
@@ -253,12 +360,18 @@ Provide a comprehensive medical interpretation that integrates all available dat
 
     def _format_health_profile(self) -> str:
         """Format user's health profile for prompt inclusion."""
-        profile = self.user_health_context.get('health_profile', {})
-        return json.dumps(profile, indent=2)
+        return self._health_profile_json
 
     def _format_wearable_data(self, wearable_data: Dict[str, Any]) -> str:
         """Format wearable data summary for prompt inclusion."""
-        return json.dumps(wearable_data, indent=2)
+        return dumps_pretty(wearable_data)
+
+
+@dataclass(slots=True)
+class Turn:
+    """A single message in the Health Coach's conversation history."""
+    role: str
+    message: str
 
 
 class HealthCoachAgent:
@@ -277,14 +390,47 @@ class HealthCoachAgent:
             user_context: User's profile, goals, and conversation history
         """
         self.user_context = user_context
-        self.conversation_history: List[Dict[str, str]] = []
+        # Only the last 10 turns are ever shown to the model, so keep no more than that
+        self.conversation_history: Deque[Turn] = deque(maxlen=10)
         self.identified_goals: List[str] = []
-        self.system_prompt = get_agent_prompt(
+
+    @cached_property
+    def system_prompt(self) -> str:
+        """System prompt embedding the user context, rendered on first use."""
+        return get_agent_prompt(
             'HC',
-            user_context=json.dumps(user_context, indent=2),
+            user_context=self._user_context_json,
             available_insights=""
         )
 
+    @property
+    def _cached_content(self):
+        """Server-side context cache for the system prompt, re-registered as it expires."""
+        return create_cached_context(self.system_prompt, system_prompt_hash=self._system_prompt_hash)
+
+    @cached_property
+    def _system_prompt_hash(self) -> bytes:
+        """Response-cache digest of the system prompt, computed once per context."""
+        return hash_system_prompt(self.system_prompt)
+
+    def _reset_system_prompt(self):
+        """Drop the rendered system prompt and its digest so the next call renders them anew."""
+        for name in ('system_prompt', '_system_prompt_hash'):
+            self.__dict__.pop(name, None)
+
+    @property
+    def user_context(self) -> Dict[str, Any]:
+        """User's profile, goals, and conversation history."""
+        return self._user_context
+
+    @user_context.setter
+    def user_context(self, value: Dict[str, Any]):
+        # Serialized once; provide_recommendations embeds it in every prompt
+        self._user_context = value
+        self._user_context_json = dumps_pretty(value)
+        # The system prompt embeds the context too
+        self._reset_system_prompt()
+
     def identify_goals(
         self,
         user_message: str,
@@ -301,21 +447,19 @@ class HealthCoachAgent:
             Coaching response to help identify goals
         """
         conversation_summary = self._format_conversation_history()
-        insights_summary = json.dumps(health_insights, indent=2) if health_insights else "No insights available yet"
-
-        user_prompt = f"""Engage with the user to identify their health goals and motivations.
-
-Conversation History:
-{conversation_summary}
+        insights_summary = dumps_pretty(health_insights) if health_insights else "No insights available yet"
 
-User's Latest Message: {user_message}
-
-Available Health Insights: {insights_summary}
-
-Use open-ended questions to explore deeper motivations, reflect back what you're hearing, and identify specific, measurable goals."""
+        user_prompt = "".join((
+            _HC_GOALS_TMPL[0], conversation_summary,
+            _HC_GOALS_TMPL[1], user_message,
+            _HC_GOALS_TMPL[2], insights_summary,
+            _HC_GOALS_TMPL[3]
+        ))
 
         response = call_gemini(
             system_prompt=self.system_prompt,
+            cached_content=self._cached_content,
+            system_prompt_hash=self._system_prompt_hash,
             user_prompt=user_prompt,
             temperature=0.7  # Higher temperature for more natural conversation
         )
@@ -348,7 +492,7 @@ Use open-ended questions to explore deeper motivations, reflect back what you're
         user_prompt = render_prompt(
             HC_RECOMMENDATION_PROMPT,
             user_goals="\n".join(f"- {goal}" for goal in user_goals),
-            user_context=json.dumps(self.user_context, indent=2),
+            user_context=self._user_context_json,
             ds_insights=ds_insights or "No data analysis available",
             de_insights=de_insights or "No medical insights available",
             stage=stage
@@ -356,6 +500,8 @@ Use open-ended questions to explore deeper motivations, reflect back what you're
 
         response = call_gemini(
             system_prompt=self.system_prompt,
+            cached_content=self._cached_content,
+            system_prompt_hash=self._system_prompt_hash,
             user_prompt=user_prompt,
             temperature=0.6
         )
@@ -379,21 +525,17 @@ Use open-ended questions to explore deeper motivations, reflect back what you're
         """
         conversation_summary = self._format_conversation_history()
 
-        user_prompt = f"""Process the user's feedback on your previous recommendation and adjust your coaching approach.
-
-Conversation History:
-{conversation_summary}
-
-Previous Recommendation:
-{previous_recommendation}
-
-User's Feedback:
-{user_feedback}
-
-Acknowledge their feedback, adjust your approach based on their response, and provide revised guidance that better fits their needs and preferences."""
+        user_prompt = "".join((
+            _HC_FEEDBACK_TMPL[0], conversation_summary,
+            _HC_FEEDBACK_TMPL[1], previous_recommendation,
+            _HC_FEEDBACK_TMPL[2], user_feedback,
+            _HC_FEEDBACK_TMPL[3]
+        ))
 
         response = call_gemini(
             system_prompt=self.system_prompt,
+            cached_content=self._cached_content,
+            system_prompt_hash=self._system_prompt_hash,
             user_prompt=user_prompt,
             temperature=0.7
         )
@@ -409,21 +551,19 @@ Acknowledge their feedback, adjust your approach based on their response, and pr
         if not self.conversation_history:
             return "No previous conversation"
 
-        history_lines = []
-        for turn in self.conversation_history[-10:]:  # Last 10 turns
-            role = turn['role'].capitalize()
-            message = turn['message']
-            history_lines.append(f"{role}: {message}")
-
-        return "\n\n".join(history_lines)
+        return "\n\n".join(
+            f"{turn.role.capitalize()}: {turn.message}"
+            for turn in self.conversation_history
+        )
 
     def _add_to_history(self, role: str, message: str):
         """Add a message to conversation history."""
-        self.conversation_history.append({
-            'role': role,
-            'message': message,
-            'timestamp': None  # Could add actual timestamp if needed
-        })
+        self.conversation_history.append(Turn(role, message))
+
+    def reset_conversation(self):
+        """Forget the conversation so far, keeping the user context and prompts."""
+        self.conversation_history.clear()
+        self.identified_goals.clear()
 
 
 # ============================================================================
@@ -1,21 +1,444 @@
-import google.generativeai as genai
+import datetime
+import functools
+import hashlib
 import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Iterator, List, Optional
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+# Constrained JSON extraction (e.g. memory updates) does as well on a lighter model,
+# at lower latency and cost. Set PHA_EXTRACTION_MODEL to route it elsewhere.
+EXTRACTION_MODEL = os.environ.get("PHA_EXTRACTION_MODEL", "gemini-2.5-flash-lite")
+DEFAULT_EMBEDDING_MODEL = "models/text-embedding-004"
 
 # --- 1. INITIALIZE THE GEMINI CLIENT ---
-# This code securely reads your API key from the environment variables.
-# It's wrapped in a try-except block to give a helpful message if the key is missing.
-try:
-    api_key = os.environ.get("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY not found in environment variables")
-    genai.configure(api_key=api_key)
-    print("✅ Gemini API client initialized successfully")
-except Exception as e:
-    print(f"Error initializing Gemini client: {e}")
-    print("Please make sure your GOOGLE_API_KEY environment variable is set.")
-
-# --- 2. CREATE A REUSABLE FUNCTION ---
-def call_gemini(system_prompt: str, user_prompt: str, model: str = "gemini-2.5-flash", temperature: float = 0.5, max_tokens: int = 8192):
+# The SDK is heavy to import, so it is loaded and configured on the first API call
+# rather than when this module is imported. This keeps tests and data-only modes fast.
+# The API key is read securely from the GOOGLE_API_KEY environment variable.
+# The SDK keeps one client per process, so every agent and query shares a single
+# persistent gRPC (HTTP/2) channel; the transport is pinned so that stays true.
+genai = None
+_retryable_errors = ()
+# Errors Gemini raises for a CachedContent handle that has expired or been deleted
+_stale_context_errors = ()
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def _ensure_configured():
+    """Import and configure the Gemini SDK once, raising if the API key is missing."""
+    global genai, _retryable_errors, _stale_context_errors, _configured
+    if _configured:
+        return
+
+    with _configure_lock:
+        if _configured:
+            return
+
+        api_key = os.environ.get("GOOGLE_API_KEY")
+        if not api_key:
+            raise ValueError(
+                "GOOGLE_API_KEY not found in environment variables. "
+                "Please make sure your GOOGLE_API_KEY environment variable is set."
+            )
+
+        import google.generativeai as genai_module
+        from google.api_core import exceptions as api_exceptions
+        genai_module.configure(api_key=api_key, transport="grpc")
+        genai = genai_module
+        _retryable_errors = (
+            api_exceptions.ResourceExhausted,
+            api_exceptions.ServiceUnavailable,
+            api_exceptions.DeadlineExceeded,
+        )
+        _stale_context_errors = (
+            api_exceptions.NotFound,
+            api_exceptions.PermissionDenied,
+        )
+        _configured = True
+
+
+# --- 2. RESPONSE CACHE ---
+# Identical (model, temperature, max_tokens, system_prompt, user_prompt) requests
+# are answered from memory for a short while instead of issuing another API call.
+# Responses are also kept on disk (PHA_CACHE_DIR, default ~/.cache/pha) so they
+# survive process restarts, for PHA_CACHE_TTL seconds (default an hour; e.g. 604800
+# keeps repeated development runs free for a week).
+# Set PHA_CACHE_DISABLE=1 to always hit the API (e.g. for determinism-sensitive tests).
+class _TTLCache:
+    """A small thread-safe LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def ensure_private_dir(path: str) -> None:
+    """
+    Create a cache directory readable only by the current user.
+
+    An existing directory must belong to the current user, and is tightened to
+    0o700 if it is group- or world-accessible.
+
+    Args:
+        path: Directory to create or check
+
+    Raises:
+        PermissionError: If the directory belongs to another user
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.stat(path)
+    if hasattr(os, "getuid") and st.st_uid != os.getuid():
+        raise PermissionError(f"Cache directory {path} is owned by another user")
+    if st.st_mode & 0o077:
+        os.chmod(path, 0o700)
+
+
+class _DiskCache:
+    """
+    A SQLite-backed response store that survives process restarts.
+
+    The database is opened on first use. Any SQLite error (read-only or full disk,
+    corrupt file, a cache directory owned by another user) disables the disk layer for the rest of the process instead of
+    failing the API call.
+    """
+
+    def __init__(self, directory: str, ttl: float, size_limit: int):
+        self.path = os.path.join(directory, "responses.sqlite3")
+        self.ttl = ttl
+        self.size_limit = size_limit
+        self._conn = None
+        self._disabled = False
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            # Responses contain personal health information, so keep them private.
+            # SQLite gives its -wal and -shm files the database file's permissions.
+            ensure_private_dir(os.path.dirname(self.path))
+            os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+            os.chmod(self.path, 0o600)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            # WAL lets several processes share the cache without blocking readers
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key BLOB PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get(self, key):
+        if self._disabled:
+            return None
+        with self._lock:
+            try:
+                row = self._connect().execute(
+                    "SELECT value FROM responses WHERE key = ? AND expires_at > ?",
+                    (key, time.time())
+                ).fetchone()
+            except (sqlite3.Error, OSError):
+                self._disabled = True
+                return None
+        return row[0] if row else None
+
+    def __setitem__(self, key, value):
+        if self._disabled:
+            return
+        with self._lock:
+            try:
+                conn = self._connect()
+                now = time.time()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, now + self.ttl)
+                )
+                conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+                self._enforce_size_limit(conn)
+            except (sqlite3.Error, OSError):
+                self._disabled = True
+
+    def _enforce_size_limit(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM responses").fetchone()[0]
+        if total > self.size_limit:
+            # Drop the entries closest to expiry until we are back under the limit
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY expires_at LIMIT "
+                "(SELECT COUNT(*) / 4 + 1 FROM responses))"
+            )
+
+
+CACHE_DIR = os.environ.get("PHA_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "pha")
+DISK_CACHE_TTL = float(os.environ.get("PHA_CACHE_TTL", 3600))
+
+_RESPONSE_CACHE = _TTLCache(maxsize=1024, ttl=600)
+_DISK_CACHE = _DiskCache(CACHE_DIR, ttl=DISK_CACHE_TTL, size_limit=512 << 20)
+
+
+def _cache_get(key: bytes):
+    """Look a response up in memory, then on disk (promoting disk hits to memory)."""
+    text = _RESPONSE_CACHE.get(key)
+    if text is None:
+        text = _DISK_CACHE.get(key)
+        if text is not None:
+            _RESPONSE_CACHE[key] = text
+    return text
+
+
+def _cache_set(key: bytes, text: str):
+    """Store a successful response in both cache layers."""
+    _RESPONSE_CACHE[key] = text
+    _DISK_CACHE[key] = text
+
+# Requests currently being answered, keyed like the cache, so concurrent duplicates
+# wait for the first one (single-flight) instead of issuing their own API call
+_INFLIGHT = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+
+def cache_enabled() -> bool:
+    """Whether caching is on, i.e. PHA_CACHE_DISABLE is not set."""
+    return os.environ.get("PHA_CACHE_DISABLE", "").lower() not in ("1", "true", "yes")
+
+
+def hash_system_prompt(system_prompt: str) -> bytes:
+    """
+    Digest of a system prompt for use as call_gemini's `system_prompt_hash`.
+
+    System prompts embed the serialized user data and rarely change, so callers that
+    reuse one can hash it once instead of on every call.
+    """
+    return hashlib.blake2b(system_prompt.encode(), digest_size=16).digest()
+
+
+def _cache_key(
+    system_prompt: str,
+    user_prompt: str,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    system_prompt_hash: Optional[bytes] = None
+) -> bytes:
+    if system_prompt_hash is None:
+        system_prompt_hash = hash_system_prompt(system_prompt)
+    return hashlib.blake2b(
+        b"|".join((system_prompt_hash, f"{model}|{temperature}|{max_tokens}|{user_prompt}".encode())),
+        digest_size=16
+    ).digest()
+
+
+# --- 3. SERVER-SIDE CONTEXT CACHING ---
+# Agent system prompts embed large, static JSON blobs of user data. Registering them
+# once as Gemini CachedContent means each call only ships the user prompt.
+# Registrations expire server-side, so callers fetch the handle through
+# create_cached_context on every call rather than holding on to it; a handle that
+# Gemini no longer recognizes is dropped and the request resent with the prompt inline.
+_CONTEXT_CACHE = {}
+# Registrations in progress, keyed like _CONTEXT_CACHE: concurrent callers for the same
+# prompt wait for the first one's registration, while other prompts register alongside
+_CONTEXT_INFLIGHT = {}
+_CONTEXT_CACHE_LOCK = threading.Lock()
+
+
+def create_cached_context(
+    system_prompt: str,
+    model: str = DEFAULT_MODEL,
+    ttl: int = 3600,
+    system_prompt_hash: Optional[bytes] = None
+):
+    """
+    Register a system prompt with Gemini's context cache, reusing earlier registrations.
+
+    Registrations are renewed shortly before Gemini expires them, so calling this on
+    every request is cheap and always returns a live handle.
+
+    Args:
+        system_prompt (str): The static system prompt to store server-side.
+        model (str): The model the cached content will be used with.
+        ttl (int): Lifetime of the cached content in seconds.
+        system_prompt_hash (bytes): Optional hash_system_prompt(system_prompt), so a
+                                    long, reused system prompt isn't rehashed.
+
+    Returns:
+        CachedContent or None: The cache handle, or None if the prompt could not be cached
+                               (e.g. it is below the model's minimum cacheable size).
+    """
+    if system_prompt_hash is None:
+        system_prompt_hash = hash_system_prompt(system_prompt)
+    key = (model, system_prompt_hash)
+    with _CONTEXT_CACHE_LOCK:
+        entry = _CONTEXT_CACHE.get(key)
+        # Refresh a little before Gemini expires the cached content
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+        future = _CONTEXT_INFLIGHT.get(key)
+        is_leader = future is None
+        if is_leader:
+            future = Future()
+            _CONTEXT_INFLIGHT[key] = future
+
+    if not is_leader:
+        return future.result()
+
+    # The registration RPC runs outside the lock
+    try:
+        _ensure_configured()
+        cached_content = genai.caching.CachedContent.create(
+            model=model,
+            system_instruction=system_prompt,
+            ttl=datetime.timedelta(seconds=ttl)
+        )
+    except Exception:
+        # Caching is an optimization; fall back to sending the prompt inline
+        cached_content = None
+    except BaseException as e:
+        with _CONTEXT_CACHE_LOCK:
+            del _CONTEXT_INFLIGHT[key]
+        future.set_exception(e)
+        raise
+
+    with _CONTEXT_CACHE_LOCK:
+        _CONTEXT_CACHE[key] = (time.monotonic() + ttl * 0.9, cached_content)
+        del _CONTEXT_INFLIGHT[key]
+    future.set_result(cached_content)
+    return cached_content
+
+
+def _drop_cached_context(cached_content):
+    """Forget a handle Gemini no longer recognizes, so the next call registers afresh."""
+    with _CONTEXT_CACHE_LOCK:
+        for key, (_, handle) in list(_CONTEXT_CACHE.items()):
+            if handle is cached_content:
+                del _CONTEXT_CACHE[key]
+    # Models built on the dead handle would fail the same way
+    _get_cached_model.cache_clear()
+
+
+def _is_stale_context(error: Exception) -> bool:
+    """Whether a failed request was rejected because its cached content is gone."""
+    return isinstance(error.__cause__, _stale_context_errors)
+
+
+# --- 4. MODEL INSTANCES ---
+# GenerativeModel construction validates the generation config on every call, so
+# instances are built once per distinct (model, temperature, max_tokens) combination.
+@functools.lru_cache(maxsize=32)
+def _get_model(model: str, temperature: float, max_tokens: int):
+    return genai.GenerativeModel(
+        model_name=model,
+        generation_config={
+            "temperature": temperature,
+            "max_output_tokens": max_tokens,
+            "candidate_count": 1,
+        }
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def _get_cached_model(cached_content, temperature: float, max_tokens: int):
+    return genai.GenerativeModel.from_cached_content(
+        cached_content,
+        generation_config={
+            "temperature": temperature,
+            "max_output_tokens": max_tokens,
+            "candidate_count": 1,
+        }
+    )
+
+
+def _prepare_request(system_prompt, user_prompt, model, temperature, max_tokens, cached_content):
+    """Return the model instance and prompt contents for a single request."""
+    if cached_content is not None:
+        # The system prompt already lives server-side; only send the user turn
+        return _get_cached_model(cached_content, temperature, max_tokens), user_prompt
+
+    # Gemini doesn't have a separate system parameter, so we prepend it to the user message
+    # This is a common pattern for models without explicit system prompt support
+    combined_prompt = f"{system_prompt}\n\n---\n\nUser Query: {user_prompt}"
+    return _get_model(model, temperature, max_tokens), combined_prompt
+
+
+# --- 5. CREATE A REUSABLE FUNCTION ---
+# Rate limits (429), transient outages (503) and timeouts are retried with capped
+# exponential backoff plus jitter. Anything else, or a transient error that outlasts
+# every attempt, is raised as a GeminiAPIError rather than returned as response text.
+MAX_ATTEMPTS = 5
+_BACKOFF_INITIAL = 0.5
+_BACKOFF_MAX = 8.0
+
+
+class GeminiAPIError(RuntimeError):
+    """Raised when a Gemini API call fails and no response text is available."""
+
+
+class GeminiRetryError(GeminiAPIError):
+    """Raised when a transient Gemini error persists through every retry attempt."""
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Seconds to wait before retry number `attempt` (0-based), with up to 1s of jitter."""
+    return min(_BACKOFF_INITIAL * 2 ** attempt + random.uniform(0, 1), _BACKOFF_MAX)
+
+
+def _with_retries(request):
+    """Run `request()`, retrying transient API errors and wrapping all failures."""
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            return request()
+        except _retryable_errors as e:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise GeminiRetryError(
+                    f"Gemini API call still failing after {MAX_ATTEMPTS} attempts: {e}"
+                ) from e
+            time.sleep(_backoff_delay(attempt))
+        except GeminiAPIError:
+            raise
+        except Exception as e:
+            raise GeminiAPIError(f"An error occurred with the Gemini API call: {e}") from e
+
+
+def call_gemini(
+    system_prompt: str,
+    user_prompt: str,
+    model: str = DEFAULT_MODEL,
+    temperature: float = 0.5,
+    max_tokens: int = 8192,
+    cached_content: Optional["genai.caching.CachedContent"] = None,
+    system_prompt_hash: Optional[bytes] = None,
+    use_cache: bool = True
+):
     """
     A wrapper function to call the Google Gemini API with system prompt support.
 
@@ -26,35 +449,168 @@ def call_gemini(system_prompt: str, user_prompt: str, model: str = "gemini-2.5-f
         model (str): The Gemini model to use (default: gemini-1.5-pro).
         temperature (float): Controls randomness (0.0-1.0). Lower is more predictable, higher is more creative.
         max_tokens (int): Maximum length of the response.
+        cached_content (CachedContent): Optional server-side cache holding `system_prompt`
+                                        (see create_cached_context). When given, only the
+                                        user prompt is sent.
+        system_prompt_hash (bytes): Optional hash_system_prompt(system_prompt), so the cache
+                                    key doesn't rehash a long, reused system prompt.
+        use_cache (bool): Set to False to always issue a fresh request, e.g. for creative
+                          calls where a replayed response defeats the purpose. The result
+                          is not cached either.
 
     Returns:
-        str: The text content of Gemini's response, or an error message.
+        str: The text content of Gemini's response.
+
+    Raises:
+        GeminiAPIError: If the API call fails. Rate-limit, unavailable and timeout errors
+                        are retried first and raise GeminiRetryError once exhausted.
     """
+    if not (use_cache and cache_enabled()):
+        return _generate(system_prompt, user_prompt, model, temperature, max_tokens, cached_content)
+
+    key = _cache_key(system_prompt, user_prompt, model, temperature, max_tokens, system_prompt_hash)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
+    # Coalesce identical requests that are already in flight onto a single API call
+    with _INFLIGHT_LOCK:
+        future = _INFLIGHT.get(key)
+        is_leader = future is None
+        if is_leader:
+            # A leader that finished since the lookup above has already cached its text
+            cached = _RESPONSE_CACHE.get(key)
+            if cached is not None:
+                return cached
+            future = Future()
+            _INFLIGHT[key] = future
+
+    if not is_leader:
+        return future.result()
+
     try:
-        # Initialize the model with generation config
-        gen_model = genai.GenerativeModel(
-            model_name=model,
-            generation_config={
-                "temperature": temperature,
-                "max_output_tokens": max_tokens,
-            }
-        )
+        text = _generate(system_prompt, user_prompt, model, temperature, max_tokens, cached_content, key)
+    except BaseException as e:
+        # Followers waiting on this request see the same failure
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(text)
+        return text
+    finally:
+        with _INFLIGHT_LOCK:
+            del _INFLIGHT[key]
+
+
+def _generate(system_prompt, user_prompt, model, temperature, max_tokens, cached_content, key=None) -> str:
+    """Issue an API request (with retries), caching the text under `key` on success."""
+    def request():
+        _ensure_configured()
+        gen_model, prompt = _prepare_request(system_prompt, user_prompt, model, temperature, max_tokens, cached_content)
+        return gen_model.generate_content(prompt).text
+
+    try:
+        text = _with_retries(request)
+    except GeminiAPIError as e:
+        if cached_content is None or not _is_stale_context(e):
+            raise
+        # The cached content expired server-side; send the system prompt inline once
+        _drop_cached_context(cached_content)
+        cached_content = None
+        text = _with_retries(request)
+
+    # Remember the text for identical follow-up requests
+    if key is not None:
+        _cache_set(key, text)
+    return text
 
-        # Gemini doesn't have a separate system parameter, so we prepend it to the user message
-        # This is a common pattern for models without explicit system prompt support
-        combined_prompt = f"{system_prompt}\n\n---\n\nUser Query: {user_prompt}"
 
-        # Generate response
-        response = gen_model.generate_content(combined_prompt)
+def call_gemini_stream(
+    system_prompt: str,
+    user_prompt: str,
+    model: str = DEFAULT_MODEL,
+    temperature: float = 0.5,
+    max_tokens: int = 8192,
+    cached_content: Optional["genai.caching.CachedContent"] = None,
+    system_prompt_hash: Optional[bytes] = None,
+    use_cache: bool = True
+) -> Iterator[str]:
+    """
+    Streaming variant of call_gemini that yields text chunks as Gemini produces them.
+
+    Takes the same arguments as call_gemini. A cached response is yielded as a single
+    chunk; a fresh response is only added to the cache once the stream has completed.
+    Transient errors are only retried until the first chunk arrives, since text that
+    has already been yielded cannot be taken back.
+
+    Yields:
+        str: Successive pieces of the response text.
+
+    Raises:
+        GeminiAPIError: If the API call fails (see call_gemini).
+    """
+    use_cache = use_cache and cache_enabled()
+    if use_cache:
+        key = _cache_key(system_prompt, user_prompt, model, temperature, max_tokens, system_prompt_hash)
+        cached = _cache_get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    def open_stream():
+        _ensure_configured()
+        gen_model, prompt = _prepare_request(system_prompt, user_prompt, model, temperature, max_tokens, cached_content)
+        response = iter(gen_model.generate_content(prompt, stream=True))
+        first = next(response, None)
+        return response, first.text if first is not None else None
 
-        # Extract and return the text
-        return response.text
+    try:
+        response, first_text = _with_retries(open_stream)
+    except GeminiAPIError as e:
+        if cached_content is None or not _is_stale_context(e):
+            raise
+        # The cached content expired server-side; send the system prompt inline once
+        _drop_cached_context(cached_content)
+        cached_content = None
+        response, first_text = _with_retries(open_stream)
+    chunks = []
+    if first_text is not None:
+        chunks.append(first_text)
+        yield first_text
 
+    try:
+        for chunk in response:
+            chunks.append(chunk.text)
+            yield chunk.text
     except Exception as e:
-        # Return a clear error message if the API call fails for any reason.
-        return f"An error occurred with the Gemini API call: {e}"
+        raise GeminiAPIError(f"An error occurred with the Gemini API call: {e}") from e
 
-# --- 3. (OPTIONAL) ADD A TEST BLOCK ---
+    if use_cache:
+        _cache_set(key, "".join(chunks))
+
+
+def embed_text(text: str, model: str = DEFAULT_EMBEDDING_MODEL) -> List[float]:
+    """
+    Embed a short text (such as a user query) for semantic similarity comparisons.
+
+    Args:
+        text (str): The text to embed.
+        model (str): The Gemini embedding model to use.
+
+    Returns:
+        List[float]: The embedding vector.
+
+    Raises:
+        GeminiAPIError: If the API call fails (see call_gemini).
+    """
+    def request():
+        _ensure_configured()
+        return genai.embed_content(model=model, content=text, task_type="semantic_similarity")["embedding"]
+
+    return _with_retries(request)
+
+
+# --- 6. (OPTIONAL) ADD A TEST BLOCK ---
 # This part allows you to run this file directly to test if your setup is working.
 if __name__ == "__main__":
     print("\nTesting the Gemini API client...")
@@ -63,13 +619,13 @@ if __name__ == "__main__":
     test_system_prompt = "You are a helpful assistant specializing in health and wellness."
     test_user_prompt = "Hello! In one sentence, what is the key to a good API client?"
 
-    response = call_gemini(test_system_prompt, test_user_prompt)
-
-    print("\n--- Test Response ---")
-    print(response)
-    print("---------------------\n")
-
-    if "An error occurred" in response:
+    try:
+        response = call_gemini(test_system_prompt, test_user_prompt)
+    except GeminiAPIError as e:
+        print(f"\n{e}")
         print("❌ Test Failed. Please check your API key and environment setup.")
     else:
+        print("\n--- Test Response ---")
+        print(response)
+        print("---------------------\n")
         print("✅ Test Successful! Your Gemini API client is ready to be used by your agents.")
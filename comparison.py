@@ -5,13 +5,42 @@ This module provides tools to compare the performance, quality, and efficiency
 of the multi-agent orchestration system against the single unified agent baseline.
 """
 
+import argparse
+import asyncio
+import copy
+import hashlib
+import itertools
+import math
+import operator
+import os
+import sys
+import textwrap
 import time
-import json
-from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, AsyncIterator, Awaitable, Optional, Tuple
 from agents import DataScienceAgent, DomainExpertAgent, HealthCoachAgent
-from orchestrator import Orchestrator
+from orchestrator import Orchestrator, build_initial_context
 from unified_agent import UnifiedAgent
 from mock_data import get_mock_user_data, get_sample_queries
+from json_utils import dumps_compact, dumps_pretty, fingerprint
+from api_client import GeminiAPIError, embed_text
+
+
+# Side-by-side display layout, computed once: two columns and a 3-character separator
+_DISPLAY_WIDTH = 160  # Wider for better side-by-side view
+_COLUMN_WIDTH = (_DISPLAY_WIDTH - 3) // 2
+_COLUMN_WRAPPER = textwrap.TextWrapper(width=_COLUMN_WIDTH - 2)
+
+# Separator lines, built once rather than on every print
+_EQ_BAR = '=' * _DISPLAY_WIDTH
+_DASH_BAR = '─' * _DISPLAY_WIDTH
+_COL_DASH = '─' * _COLUMN_WIDTH
+_COLUMN_DIVIDER = f"{_COL_DASH}─┼─{_COL_DASH}"
+_COLUMN_FOOTER = f"{_COL_DASH}─┴─{_COL_DASH}"
+
+# Blocking calls one comparison can have running at once: DS code generation and DE
+# for the multi-agent system, alongside the single agent
+_THREADS_PER_QUERY = 3
 
 
 class AgentComparison:
@@ -22,12 +51,23 @@ class AgentComparison:
     qualitative comparison of response quality.
     """
 
-    def __init__(self, user_data: Dict[str, Any]):
+    def __init__(
+        self,
+        user_data: Dict[str, Any],
+        use_cache: bool = False,
+        semantic_threshold: Optional[float] = None
+    ):
         """
         Initialize comparison framework with user data.
 
         Args:
             user_data: Complete user data for both systems
+            use_cache: If True, a query that was already compared for this user data
+                       replays the stored responses instead of running both systems again.
+                       Replayed results are marked 'cached' and left out of timing averages.
+            semantic_threshold: Optional cosine similarity (e.g. 0.92) above which a
+                                paraphrase of an earlier query also replays its responses.
+                                Costs one embedding call per query that misses the exact cache.
         """
         self.user_data = user_data
         self.results = {
@@ -35,6 +75,28 @@ class AgentComparison:
             'single_agent': []
         }
 
+        # Successful comparisons by (normalized query, user data fingerprint)
+        self.use_cache = use_cache
+        self._user_hash = fingerprint(user_data)
+        self._response_cache: Dict[str, Tuple[str, Dict[str, Any], float, str, float]] = {}
+
+        # Unit-length query embeddings paired with their response cache keys
+        self.semantic_threshold = semantic_threshold
+        self._semantic_index: List[Tuple[List[float], str]] = []
+
+        # User data slices every orchestrator is built from, extracted once
+        self._initial_context = build_initial_context(user_data)
+        self._personal_data = user_data['personal_data']
+        self._health_context = user_data['health_context']
+        self._user_profile = user_data['user_profile']
+
+        # Idle systems waiting to be reused. Each query takes its own pair, so
+        # concurrent batch queries never share conversation state.
+        self._multi_pool: List[Orchestrator] = [self._init_multi_agent()]
+        self._single_pool: List[UnifiedAgent] = [UnifiedAgent(user_data)]
+        # Extra single agents are forked from this one, reusing its rendered prompt
+        self._single_prototype = self._single_pool[0]
+
     def run_single_query_comparison(self, query: str, show_metrics: bool = False) -> Dict[str, Any]:
         """
         Run a single query through both systems and compare responses side-by-side.
@@ -46,72 +108,160 @@ class AgentComparison:
         Returns:
             Dictionary with comparison results
         """
-        # Initialize fresh instances
-        multi_orchestrator = self._init_multi_agent()
-        single_agent = UnifiedAgent(self.user_data)
+        return asyncio.run(self.arun_single_query_comparison(query, show_metrics=show_metrics))
 
-        # Run multi-agent
-        start_time = time.time()
-        try:
-            multi_result = multi_orchestrator.process_query(query)
-            multi_time = time.time() - start_time
-            multi_response = multi_result['response']
-            multi_plan = multi_result['orchestration_plan']
-            multi_success = True
-        except Exception as e:
-            multi_time = time.time() - start_time
-            multi_response = f"Error: {e}"
-            multi_plan = {}
-            multi_success = False
+    async def arun_single_query_comparison(
+        self,
+        query: str,
+        show_metrics: bool = False,
+        display: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Async variant of run_single_query_comparison.
 
-        # Run single-agent
-        start_time = time.time()
-        try:
-            single_result = single_agent.process_query(query)
-            single_time = time.time() - start_time
-            single_response = single_result['response']
-            single_success = True
-        except Exception as e:
-            single_time = time.time() - start_time
-            single_response = f"Error: {e}"
-            single_success = False
+        The two systems are independent and network-bound, so they run concurrently
+        and the comparison takes roughly as long as the slower of the two. Pass
+        display=False to skip printing, e.g. when the caller prints results in order.
+        """
+        cache_key = self._response_cache_key(query)
+        cached = self._response_cache.get(cache_key) if self.use_cache else None
+
+        query_vector = None
+        if cached is None and self.use_cache and self.semantic_threshold is not None:
+            query_vector, cached = await asyncio.to_thread(self._semantic_lookup, query)
+
+        if cached is not None:
+            # Replay the earlier run, including its timings, instead of calling the LLMs again
+            multi_response, multi_plan, multi_time, single_response, single_time = cached
+            multi_error = single_error = None
+        else:
+            multi_orchestrator, single_agent = self._acquire_systems()
+
+            # Each branch is timed on its own rather than around the gather
+            try:
+                (multi_result, multi_time, multi_exc), (single_result, single_time, single_exc) = (
+                    await asyncio.gather(
+                        self._timed(multi_orchestrator.aprocess_query(query)),
+                        self._timed(single_agent.aprocess_query(query))
+                    )
+                )
+            finally:
+                self._multi_pool.append(multi_orchestrator)
+                self._single_pool.append(single_agent)
+
+            multi_error = self._describe_error(multi_exc)
+            if multi_exc is None:
+                multi_response = multi_result['response']
+                multi_plan = multi_result['orchestration_plan']
+            else:
+                multi_response = f"Error: {multi_exc}"
+                multi_plan = {}
+
+            single_error = self._describe_error(single_exc)
+            single_response = single_result['response'] if single_exc is None else f"Error: {single_exc}"
+
+            if self.use_cache and multi_exc is None and single_exc is None:
+                self._response_cache[cache_key] = (
+                    multi_response, multi_plan, multi_time, single_response, single_time
+                )
+                if query_vector is not None:
+                    self._semantic_index.append((query_vector, cache_key))
 
         # Display side-by-side comparison
-        self._display_side_by_side_comparison(
-            query=query,
-            multi_response=multi_response,
-            single_response=single_response,
-            multi_plan=multi_plan,
-            multi_time=multi_time,
-            single_time=single_time,
-            show_metrics=show_metrics
-        )
+        if display:
+            self._display_side_by_side_comparison(
+                query=query,
+                multi_response=multi_response,
+                single_response=single_response,
+                multi_plan=multi_plan,
+                multi_time=multi_time,
+                single_time=single_time,
+                show_metrics=show_metrics,
+                cached=cached is not None
+            )
 
         # Store results
         comparison_result = {
             'query': query,
+            'cached': cached is not None,
             'multi_agent': {
                 'response': multi_response,
                 'time': multi_time,
                 'plan': multi_plan,
-                'success': multi_success
+                'success': multi_error is None,
+                'error': multi_error
             },
             'single_agent': {
                 'response': single_response,
                 'time': single_time,
-                'success': single_success
+                'success': single_error is None,
+                'error': single_error
             },
             'metrics': {
-                'time_ratio': multi_time / single_time if single_time > 0 else 0,
-                'multi_faster': multi_time < single_time if single_time > 0 else False
+                'time_ratio': multi_time / max(single_time, 1e-9),
+                'multi_faster': multi_time < single_time
             }
         }
 
-        self.results['multi_agent'].append(comparison_result['multi_agent'])
-        self.results['single_agent'].append(comparison_result['single_agent'])
+        # Keep only the metrics; responses are returned (and saved by batch runs)
+        for system in ('multi_agent', 'single_agent'):
+            self.results[system].append({
+                'time': comparison_result[system]['time'],
+                'success': comparison_result[system]['success'],
+                'cached': comparison_result['cached']
+            })
 
         return comparison_result
 
+    def _response_cache_key(self, query: str) -> str:
+        """Key a query by its normalized text and the user data it is answered against."""
+        normalized = " ".join(query.lower().split())
+        return hashlib.blake2b(f"{self._user_hash}|{normalized}".encode(), digest_size=16).hexdigest()
+
+    def _semantic_lookup(self, query: str) -> Tuple[Optional[List[float]], Optional[Tuple]]:
+        """
+        Find a cached comparison for a paraphrase of `query`.
+
+        Returns:
+            (unit-length query embedding, cached entry of the most similar earlier query if
+            it meets semantic_threshold). The embedding is None if the embedding call failed.
+        """
+        try:
+            vector = embed_text(query)
+        except GeminiAPIError:
+            return None, None
+
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        vector = [x / norm for x in vector]
+
+        best_similarity, best_key = -1.0, None
+        for cached_vector, key in self._semantic_index:
+            similarity = sum(map(operator.mul, vector, cached_vector))
+            if similarity > best_similarity:
+                best_similarity, best_key = similarity, key
+
+        if best_key is not None and best_similarity >= self.semantic_threshold:
+            return vector, self._response_cache.get(best_key)
+        return vector, None
+
+    @staticmethod
+    async def _timed(
+        awaitable: Awaitable[Dict[str, Any]]
+    ) -> Tuple[Optional[Dict[str, Any]], float, Optional[Exception]]:
+        """Await a system's query, returning (result or None, seconds taken, exception or None)."""
+        start_time = time.perf_counter()
+        try:
+            return await awaitable, time.perf_counter() - start_time, None
+        except Exception as e:
+            return None, time.perf_counter() - start_time, e
+
+    @staticmethod
+    def _describe_error(exc: Optional[Exception]) -> Optional[Dict[str, str]]:
+        """Structured form of a failed system's exception, for saved results."""
+        if exc is None:
+            return None
+        return {'type': type(exc).__name__, 'message': str(exc)}
+
     def _display_side_by_side_comparison(
         self,
         query: str,
@@ -120,7 +270,8 @@ class AgentComparison:
         multi_plan: Dict[str, Any],
         multi_time: float,
         single_time: float,
-        show_metrics: bool
+        show_metrics: bool,
+        cached: bool = False
     ):
         """
         Display responses side-by-side for easy quality comparison.
@@ -133,124 +284,191 @@ class AgentComparison:
             multi_time: Multi-agent response time
             single_time: Single-agent response time
             show_metrics: Whether to show timing metrics
+            cached: Whether the responses were replayed from the comparison cache
         """
-        import textwrap
+        col_width = _COLUMN_WIDTH
 
-        # Terminal width
-        width = 160  # Wider for better side-by-side view
-        col_width = (width - 3) // 2  # 3 for separator
-
-        print(f"\n{'=' * width}")
-        print("RESPONSE QUALITY COMPARISON")
-        print(f"{'=' * width}\n")
-
-        # Query
-        print(f"Query: {query}\n")
+        # Build the whole block and write it at once rather than printing line by line
+        lines = [
+            f"\n{_EQ_BAR}",
+            "RESPONSE QUALITY COMPARISON",
+            f"{_EQ_BAR}\n",
+            # Query
+            f"Query: {query}{' [cached]' if cached else ''}\n",
+        ]
 
         # Header
         header_left = "MULTI-AGENT SYSTEM".center(col_width)
         header_right = "SINGLE-AGENT SYSTEM".center(col_width)
-        print(f"{header_left} │ {header_right}")
-        print(f"{'─' * col_width}─┼─{'─' * col_width}")
+        lines.append(f"{header_left} │ {header_right}")
+        lines.append(_COLUMN_DIVIDER)
 
         # Agent info (compact)
         if show_metrics:
             agents_left = f"Main: {multi_plan.get('main_agent', 'N/A')}, Supporting: {', '.join(multi_plan.get('supporting_agents', []))}"[:col_width]
             agents_right = "Unified (DS + DE + HC)"
-            print(f"{agents_left:<{col_width}} │ {agents_right:<{col_width}}")
-            print(f"{'─' * col_width}─┼─{'─' * col_width}")
-
-        # Wrap responses for side-by-side display
-        multi_lines = textwrap.wrap(multi_response, width=col_width - 2)
-        single_lines = textwrap.wrap(single_response, width=col_width - 2)
-
-        # Pad to same length
-        max_lines = max(len(multi_lines), len(single_lines))
-        multi_lines += [''] * (max_lines - len(multi_lines))
-        single_lines += [''] * (max_lines - len(single_lines))
-
-        # Print responses side-by-side
-        for left, right in zip(multi_lines, single_lines):
-            print(f"{left:<{col_width}} │ {right:<{col_width}}")
+            lines.append(f"{agents_left:<{col_width}} │ {agents_right:<{col_width}}")
+            lines.append(_COLUMN_DIVIDER)
+
+        # Wrap responses and lay them out side-by-side, padding the shorter column
+        multi_lines = _COLUMN_WRAPPER.wrap(multi_response)
+        single_lines = _COLUMN_WRAPPER.wrap(single_response)
+        lines.extend(
+            f"{left:<{col_width}} │ {right:<{col_width}}"
+            for left, right in itertools.zip_longest(multi_lines, single_lines, fillvalue='')
+        )
 
-        print(f"{'─' * col_width}─┴─{'─' * col_width}")
+        lines.append(_COLUMN_FOOTER)
 
         # Optional metrics footer
         if show_metrics:
-            print(f"\n⏱  Response Time: Multi={multi_time:.2f}s | Single={single_time:.2f}s")
-            print(f"📞 LLM Calls: Multi=5-7 | Single=2")
+            replayed = " (from the original run, replayed from cache)" if cached else ""
+            lines.append(f"\n⏱  Response Time: Multi={multi_time:.2f}s | Single={single_time:.2f}s{replayed}")
+            lines.append(f"📞 LLM Calls: Multi=5-7 | Single=2")
 
-        print(f"\n{'=' * width}\n")
+        lines.append(f"\n{_EQ_BAR}\n")
 
         # Evaluation prompt
-        print("Compare the responses above based on:")
-        print("  • Depth and thoroughness of analysis")
-        print("  • Medical accuracy and clinical reasoning")
-        print("  • Actionability and practical recommendations")
-        print("  • Personalization to user's specific context")
-        print("  • Clarity and helpfulness of explanation")
-        print(f"\n{'=' * width}\n")
-
-    def run_batch_comparison(self, queries: List[str], save_results: bool = True, show_metrics: bool = False) -> Dict[str, Any]:
+        lines.extend((
+            "Compare the responses above based on:",
+            "  • Depth and thoroughness of analysis",
+            "  • Medical accuracy and clinical reasoning",
+            "  • Actionability and practical recommendations",
+            "  • Personalization to user's specific context",
+            "  • Clarity and helpfulness of explanation",
+            f"\n{_EQ_BAR}\n",
+        ))
+
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+
+    def run_batch_comparison(
+        self,
+        queries: List[str],
+        save_results: bool = True,
+        show_metrics: bool = False,
+        pause_between: bool = False,
+        concurrency: int = 8
+    ) -> Dict[str, Any]:
         """
         Run multiple queries through both systems and generate report.
 
+        Each comparison is appended to a JSONL file as soon as it finishes, and only
+        its timing and success flags are kept in memory for the aggregate report.
+
         Args:
             queries: List of queries to test
-            save_results: Whether to save results to JSON file
+            save_results: Whether to save results (comparisons as JSONL, report as JSON)
             show_metrics: Whether to show timing and API metrics for each query
+            pause_between: If True, run queries one at a time and wait for Enter after
+                           each so it can be evaluated. By default queries run
+                           concurrently and each comparison is printed as it finishes.
+            concurrency: Maximum number of queries in flight when not pausing
 
         Returns:
-            Dictionary with aggregate metrics and results
+            Dictionary with aggregate metrics (and the results file paths when saved)
         """
-        print(f"\n{'=' * 160}")
+        print(f"\n{_EQ_BAR}")
         print(f"BATCH QUALITY COMPARISON: {len(queries)} queries")
-        print(f"{'=' * 160}\n")
+        print(f"{_EQ_BAR}\n")
         print("Focus: Response quality evaluation across multiple query types\n")
 
-        all_comparisons = []
-
-        for i, query in enumerate(queries, 1):
-            print(f"\n{'─' * 160}")
-            print(f"QUERY {i}/{len(queries)}")
-            print(f"{'─' * 160}\n")
-            comparison = self.run_single_query_comparison(query, show_metrics=show_metrics)
-            all_comparisons.append(comparison)
+        results_path = summary_path = None
+        results_file = None
+        if save_results:
+            base_name = f"comparison_results_{int(time.time())}"
+            results_path = f"{base_name}.jsonl"
+            summary_path = f"{base_name}_summary.json"
+            results_file = open(results_path, 'w')
+
+        # Running totals for the aggregate report; the responses themselves only go to disk.
+        # Replayed comparisons count towards success rates but not timings.
+        totals = {
+            'multi_agent': {'time': 0.0, 'timed': 0, 'successes': 0},
+            'single_agent': {'time': 0.0, 'timed': 0, 'successes': 0}
+        }
+        cached_queries = 0
+
+        def record(comparison: Dict[str, Any]):
+            nonlocal cached_queries
+            if results_file is not None:
+                results_file.write(dumps_compact(comparison) + '\n')
+                results_file.flush()
+            cached_queries += comparison['cached']
+            for system, total in totals.items():
+                result = comparison[system]
+                if result['success']:
+                    total['successes'] += 1
+                    if not comparison['cached']:
+                        total['time'] += result['time']
+                        total['timed'] += 1
 
-            # Prompt for evaluation after each query
-            if i < len(queries):
-                input("\nPress Enter to continue to next query...")
+        try:
+            if pause_between:
+                for i, query in enumerate(queries, 1):
+                    self._print_query_header(i, len(queries))
+                    record(self.run_single_query_comparison(query, show_metrics=show_metrics))
+
+                    # Prompt for evaluation after each query
+                    if i < len(queries):
+                        input("\nPress Enter to continue to next query...")
+            else:
+                async def run_all():
+                    # Enough threads that no query waits for one, so timings measure latency
+                    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(
+                        max_workers=concurrency * _THREADS_PER_QUERY, thread_name_prefix="pha-compare"
+                    ))
+                    async for i, comparison in self.aiter_batch_comparison(queries, concurrency):
+                        self._print_query_header(i, len(queries))
+                        self._display_side_by_side_comparison(
+                            query=comparison['query'],
+                            multi_response=comparison['multi_agent']['response'],
+                            single_response=comparison['single_agent']['response'],
+                            multi_plan=comparison['multi_agent']['plan'],
+                            multi_time=comparison['multi_agent']['time'],
+                            single_time=comparison['single_agent']['time'],
+                            show_metrics=show_metrics,
+                            cached=comparison['cached']
+                        )
+                        record(comparison)
+
+                asyncio.run(run_all())
+        finally:
+            if results_file is not None:
+                results_file.close()
 
         # Calculate aggregate metrics
-        multi_times = [c['multi_agent']['time'] for c in all_comparisons if c['multi_agent']['success']]
-        single_times = [c['single_agent']['time'] for c in all_comparisons if c['single_agent']['success']]
-
         report = {
             'total_queries': len(queries),
+            'cached_queries': cached_queries,
             'avg_response_time': {
-                'multi_agent': sum(multi_times) / len(multi_times) if multi_times else 0,
-                'single_agent': sum(single_times) / len(single_times) if single_times else 0
+                system: total['time'] / total['timed'] if total['timed'] else 0
+                for system, total in totals.items()
             },
             'success_rate': {
-                'multi_agent': sum(1 for c in all_comparisons if c['multi_agent']['success']) / len(queries),
-                'single_agent': sum(1 for c in all_comparisons if c['single_agent']['success']) / len(queries)
+                system: total['successes'] / len(queries)
+                for system, total in totals.items()
             },
             'estimated_llm_calls': {
                 'multi_agent': len(queries) * 6,  # Average 6 calls per query
                 'single_agent': len(queries) * 2  # 2 calls per query (process + memory)
-            },
-            'comparisons': all_comparisons
+            }
         }
+        if save_results:
+            report['results_file'] = results_path
 
         # Print summary (only if metrics requested)
         if show_metrics:
-            print(f"\n{'=' * 160}")
+            print(f"\n{_EQ_BAR}")
             print("BATCH COMPARISON SUMMARY")
-            print(f"{'=' * 160}\n")
+            print(f"{_EQ_BAR}\n")
 
             print(f"📊 Total Queries: {report['total_queries']}\n")
 
-            print(f"⏱  Average Response Time:")
+            if cached_queries:
+                print(f"⏱  Average Response Time ({cached_queries} replayed from cache, not timed):")
+            else:
+                print(f"⏱  Average Response Time:")
             print(f"   Multi-Agent:  {report['avg_response_time']['multi_agent']:.2f}s")
             print(f"   Single-Agent: {report['avg_response_time']['single_agent']:.2f}s\n")
 
@@ -264,13 +482,69 @@ class AgentComparison:
             print(f"   Reduction:    {((report['estimated_llm_calls']['multi_agent'] - report['estimated_llm_calls']['single_agent']) / report['estimated_llm_calls']['multi_agent'] * 100):.1f}% fewer calls with single-agent\n")
 
         if save_results:
-            filename = f"comparison_results_{int(time.time())}.json"
-            with open(filename, 'w') as f:
-                json.dump(report, f, indent=2)
-            print(f"💾 Full results saved to: {filename}\n")
+            with open(summary_path, 'w') as f:
+                f.write(dumps_pretty(report))
+            print(f"💾 Full results saved to: {results_path}")
+            print(f"💾 Summary saved to: {summary_path}\n")
 
         return report
 
+    async def aiter_batch_comparison(
+        self,
+        queries: List[str],
+        concurrency: int = 8
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Compare all queries concurrently, yielding each result as soon as it finishes.
+
+        The systems' blocking calls run on the loop's default executor. Give it at
+        least concurrency * _THREADS_PER_QUERY threads (run_batch_comparison does),
+        or the timings will include time spent waiting for a thread.
+
+        Args:
+            queries: List of queries to test
+            concurrency: Maximum number of queries in flight, to stay within API rate limits
+
+        Yields:
+            (1-based position of the query in `queries`, comparison result), in
+            completion order
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def compare(index: int, query: str) -> Tuple[int, Dict[str, Any]]:
+            async with semaphore:
+                return index, await self.arun_single_query_comparison(query, display=False)
+
+        for next_done in asyncio.as_completed([compare(i, q) for i, q in enumerate(queries, 1)]):
+            yield await next_done
+
+    def _acquire_systems(self) -> Tuple[Orchestrator, UnifiedAgent]:
+        """
+        Take a multi-agent and a single-agent system, each starting a fresh conversation.
+
+        Idle instances from earlier queries are reset and reused; new ones are only
+        built when every instance is busy with a concurrent query.
+        """
+        if self._multi_pool:
+            multi_orchestrator = self._multi_pool.pop()
+            multi_orchestrator.reset_memory(self._initial_context)
+        else:
+            multi_orchestrator = self._init_multi_agent()
+
+        if self._single_pool:
+            single_agent = self._single_pool.pop()
+            single_agent.reset_memory()
+        else:
+            single_agent = self._single_prototype.fork()
+
+        return multi_orchestrator, single_agent
+
+    def _print_query_header(self, index: int, total: int):
+        """Print the separator introducing one query of a batch."""
+        print(f"\n{_DASH_BAR}")
+        print(f"QUERY {index}/{total}")
+        print(f"{_DASH_BAR}\n")
+
     def _init_multi_agent(self) -> Orchestrator:
         """
         Initialize a fresh multi-agent orchestrator.
@@ -279,36 +553,58 @@ class AgentComparison:
             Initialized Orchestrator instance
         """
         ds_agent = DataScienceAgent(
-            personal_data=self.user_data['personal_data']
+            personal_data=self._personal_data
         )
 
         de_agent = DomainExpertAgent(
-            user_health_context=self.user_data['health_context']
+            user_health_context=self._health_context
         )
 
         hc_agent = HealthCoachAgent(
-            user_context=self.user_data['user_profile']
+            user_context=self._user_profile
         )
 
         orchestrator = Orchestrator(
             ds_agent=ds_agent,
             de_agent=de_agent,
             hc_agent=hc_agent,
-            initial_context={
-                'goals': [],
-                'conditions': [c['name'] for c in self.user_data['health_context']['health_records']['conditions']],
-                'medications': [m['name'] for m in self.user_data['health_context']['health_records']['medications']],
-                'lifestyle': {},
-                'key_metrics': [],
-                'action_items': [],
-                'progress_notes': []
-            }
+            initial_context=copy.deepcopy(self._initial_context)
         )
 
         return orchestrator
 
 
-def main():
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the comparison command line."""
+    parser = argparse.ArgumentParser(
+        description="Compare the multi-agent system against the single-agent baseline.",
+        epilog="By default, focuses on response quality comparison without timing metrics."
+    )
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--batch', action='store_true',
+                        help="run on all sample queries (quality focus)")
+    target.add_argument('--interactive-batch', action='store_true',
+                        help="run sample queries one by one, pausing after each for evaluation")
+    target.add_argument('--query', nargs='+', metavar='WORD',
+                        help="run on a custom query")
+    parser.add_argument('--metrics', action='store_true',
+                        help="show timing metrics")
+    parser.add_argument('--concurrency', type=int, default=8, metavar='N',
+                        help="maximum number of batch queries in flight (default: 8)")
+    parser.add_argument('--cache', action='store_true',
+                        help="replay stored responses for repeated queries instead of calling "
+                             "the LLMs (replays are labelled and left out of timings)")
+    parser.add_argument('--semantic-cache', action='store_true',
+                        help="with --cache, also replay responses for paraphrased queries")
+    args = parser.parse_args(argv)
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.semantic_cache and not args.cache:
+        parser.error("--semantic-cache requires --cache")
+    return args
+
+
+def main(argv: Optional[List[str]] = None):
     """
     Main entry point for comparison testing.
 
@@ -317,37 +613,40 @@ def main():
         python comparison.py --batch                 # Run on all sample queries
         python comparison.py --query "..."           # Run on custom query
         python comparison.py --batch --metrics       # Run batch with timing metrics
+        python comparison.py --batch --concurrency 4 # Limit the number of queries in flight
+        python comparison.py --batch --cache         # Replay stored responses for repeated queries
+        python comparison.py --interactive-batch     # Run sample queries one by one, pausing after each
+        python comparison.py --batch --cache --semantic-cache  # Also replay responses for paraphrased queries
     """
-    import sys
+    args = _parse_args(argv)
+
+    # Comparisons measure real calls unless caching is asked for, so the Gemini
+    # response cache is off too
+    if not args.cache:
+        os.environ['PHA_CACHE_DISABLE'] = '1'
 
     user_data = get_mock_user_data()
-    comparison = AgentComparison(user_data)
-
-    # Check for metrics flag
-    show_metrics = '--metrics' in sys.argv
-    if show_metrics:
-        sys.argv.remove('--metrics')
-
-    if len(sys.argv) > 1:
-        if sys.argv[1] == '--batch':
-            # Run all sample queries
-            queries = get_sample_queries()
-            comparison.run_batch_comparison(queries, show_metrics=show_metrics)
-        elif sys.argv[1] == '--query' and len(sys.argv) > 2:
-            # Run custom query
-            query = ' '.join(sys.argv[2:])
-            comparison.run_single_query_comparison(query, show_metrics=show_metrics)
-        else:
-            print("Usage:")
-            print("  python comparison.py                      # Run comparison on first sample query")
-            print("  python comparison.py --batch              # Run on all sample queries (quality focus)")
-            print("  python comparison.py --query '...'        # Run on custom query")
-            print("  python comparison.py --batch --metrics    # Show timing metrics")
-            print("\nBy default, focuses on response quality comparison without timing metrics.")
+    comparison = AgentComparison(
+        user_data,
+        use_cache=args.cache,
+        semantic_threshold=0.92 if args.semantic_cache else None
+    )
+
+    if args.batch or args.interactive_batch:
+        # Run all sample queries, concurrently unless pausing between them
+        comparison.run_batch_comparison(
+            get_sample_queries(),
+            show_metrics=args.metrics,
+            pause_between=args.interactive_batch,
+            concurrency=args.concurrency
+        )
+    elif args.query:
+        # Run custom query
+        comparison.run_single_query_comparison(' '.join(args.query), show_metrics=args.metrics)
     else:
         # Default: run first sample query
         queries = get_sample_queries()
-        comparison.run_single_query_comparison(queries[0], show_metrics=show_metrics)
+        comparison.run_single_query_comparison(queries[0], show_metrics=args.metrics)
 
 
 if __name__ == "__main__":
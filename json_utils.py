@@ -0,0 +1,149 @@
+"""
+JSON helpers shared across the Personal Health Agent (PHA) modules.
+
+Prompts embed large pretty-printed JSON blobs of user data, memory and agent
+output, and agents parse JSON out of model responses. These helpers use orjson,
+which is considerably faster than the standard library's pure-Python indent
+formatting, and fall back to the standard library when orjson is not installed.
+"""
+
+import hashlib
+import json
+import re
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson installed
+    orjson = None
+
+if orjson is not None:
+    _PRETTY_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+    _COMPACT_OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+    _FINGERPRINT_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# A fenced markdown code block: its language tag (possibly empty), then its content
+_CODE_FENCE = re.compile(r"```([\w+-]*)(.*?)```", re.DOTALL)
+# The characters that matter when matching braces in JSON text
+_JSON_STRUCTURE = re.compile(r'[{}"\\]')
+
+
+def dumps_pretty(obj: Any) -> str:
+    """
+    Serialize an object to a 2-space indented JSON string.
+
+    Numpy arrays and scalars are serialized natively, without a .tolist() pass.
+
+    Args:
+        obj: JSON-serializable object
+
+    Returns:
+        Indented JSON string
+    """
+    if orjson is None:
+        return json.dumps(obj, indent=2, default=str)
+    return orjson.dumps(obj, option=_PRETTY_OPTIONS).decode()
+
+
+def dumps_compact(obj: Any) -> str:
+    """
+    Serialize an object to a single-line JSON string, e.g. for a JSONL record.
+
+    Args:
+        obj: JSON-serializable object
+
+    Returns:
+        JSON string without any whitespace between tokens
+    """
+    if orjson is None:
+        return json.dumps(obj, separators=(',', ':'), default=str)
+    return orjson.dumps(obj, option=_COMPACT_OPTIONS).decode()
+
+
+def fingerprint(obj: Any) -> str:
+    """
+    Compute a stable digest of an object's JSON form, independent of key order.
+
+    Args:
+        obj: JSON-serializable object
+
+    Returns:
+        Hex digest string
+    """
+    if orjson is None:
+        data = json.dumps(obj, sort_keys=True, separators=(',', ':'), default=str).encode()
+    else:
+        data = orjson.dumps(obj, option=_FINGERPRINT_OPTIONS)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def loads(text: str) -> Any:
+    """
+    Parse a JSON string.
+
+    Raises:
+        json.JSONDecodeError: If the text is not valid JSON (orjson's error type
+            subclasses it)
+    """
+    if orjson is None:
+        return json.loads(text)
+    return orjson.loads(text)
+
+
+def extract_json(text: str) -> Any:
+    """
+    Extract and parse JSON from LLM output that may wrap it in a code block or prose.
+
+    Args:
+        text: Text potentially containing JSON
+
+    Returns:
+        The parsed JSON value, usually a dictionary
+
+    Raises:
+        json.JSONDecodeError: If no valid JSON could be found
+    """
+    # Try to find JSON in code blocks first: a json block, else an untagged one
+    untagged = None
+    for fence in _CODE_FENCE.finditer(text):
+        tag = fence.group(1).lower()
+        if tag == 'json':
+            return loads(fence.group(2).strip())
+        if not tag and untagged is None:
+            untagged = fence.group(2)
+    if untagged is not None:
+        return loads(untagged.strip())
+
+    # Otherwise take the first balanced {...} object
+    start = text.find('{')
+    if start == -1:
+        return loads(text)
+    end = _object_end(text, start)
+    return loads(text[start:end] if end is not None else text[start:])
+
+
+def _object_end(text: str, start: int) -> Optional[int]:
+    """Index just past the object opening at text[start], or None if it is unterminated."""
+    depth = 0
+    in_string = False
+    escaped_at = -1
+    # Jump between structural characters instead of stepping through every one
+    for match in _JSON_STRUCTURE.finditer(text, start):
+        pos = match.start()
+        if pos == escaped_at:
+            continue
+        char = match.group()
+        if in_string:
+            if char == '"':
+                in_string = False
+            elif char == '\\':
+                escaped_at = pos + 1
+        elif char == '"':
+            in_string = True
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+    return None
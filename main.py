@@ -5,20 +5,111 @@ This script demonstrates the end-to-end functionality of the PHA system,
 including initialization, query processing, and interactive conversation.
 """
 
+import argparse
+import asyncio
+import os
 import sys
-from typing import Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
 from agents import DataScienceAgent, DomainExpertAgent, HealthCoachAgent
-from orchestrator import Orchestrator
+from orchestrator import Orchestrator, build_initial_context
 from mock_data import get_mock_user_data, get_sample_queries, print_data_summary
+from json_utils import dumps_compact, dumps_pretty
+from api_client import CACHE_DIR, DISK_CACHE_TTL, cache_enabled, ensure_private_dir
 import json
 
 
-def initialize_system(verbose=False):
+# Greetings and acknowledgements answered directly, without any LLM calls
+_TRIVIAL_RESPONSES = {
+    'hi': "Hello! How can I help with your health today?",
+    'hello': "Hello! How can I help with your health today?",
+    'hey': "Hi there! What would you like to know about your health?",
+    'thanks': "You're welcome! Let me know if there's anything else I can help with.",
+    'thank you': "You're welcome! Let me know if there's anything else I can help with.",
+    'ok': "Great. What else would you like to look into?",
+    'okay': "Great. What else would you like to look into?",
+    'bye': "Goodbye! Type 'quit' whenever you're ready to exit.",
+}
+
+
+def _canned_reply(user_input: str, last_response: Optional[str] = None) -> Optional[str]:
+    """
+    Return a fixed reply for a greeting or acknowledgement in _TRIVIAL_RESPONSES.
+
+    Anything else goes to the agents, however short. So does every input that
+    follows an agent question, where "ok" or "thanks" may be the answer.
+
+    Args:
+        user_input: Stripped user input
+        last_response: The agents' previous response, if any
+
+    Returns:
+        The reply, or None if the input should go to the agents
+    """
+    if last_response and last_response.rstrip().endswith('?'):
+        return None
+    return _TRIVIAL_RESPONSES.get(user_input.lower().strip('!.?, '))
+
+
+# Snapshot of the generated mock data, reused while the on-disk response cache is fresh
+_USER_DATA_SNAPSHOT = os.path.join(CACHE_DIR, "user_data.json")
+
+
+def load_user_data() -> Dict[str, Any]:
+    """
+    Get the mock user data, reusing it in later runs while cached responses last.
+
+    Mock data is randomly generated per process, so every run would otherwise see
+    different data and therefore different prompts. Keeping it stable lets runs
+    started within the response cache's lifetime replay cached LLM responses.
+
+    Returns:
+        Dictionary with all mock user data
+    """
+    if not cache_enabled():
+        return get_mock_user_data()
+
+    try:
+        # Health data: only trust and write a snapshot in a directory private to this user
+        ensure_private_dir(CACHE_DIR)
+    except OSError:
+        return get_mock_user_data()
+
+    try:
+        if time.time() - os.path.getmtime(_USER_DATA_SNAPSHOT) < DISK_CACHE_TTL:
+            with open(_USER_DATA_SNAPSHOT, encoding="utf-8") as f:
+                return json.load(f)
+    except (OSError, ValueError):
+        pass  # Missing, unreadable or corrupt snapshot: fall back to fresh data
+
+    user_data = get_mock_user_data()
+    try:
+        # Write atomically for concurrent runs, readable only by this user
+        tmp_path = f"{_USER_DATA_SNAPSHOT}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(dumps_compact(user_data))
+        os.replace(tmp_path, _USER_DATA_SNAPSHOT)
+    except OSError:
+        pass
+    return user_data
+
+
+def initialize_system(verbose=False, speculative=False, reuse_followup_plans=False,
+                      combine_review_calls=False):
     """
     Initialize the PHA multi-agent system with mock data.
 
     Args:
         verbose: If True, show detailed initialization steps
+        speculative: If True, start the Domain Expert while each query is still
+            being planned (see Orchestrator)
+        reuse_followup_plans: If True, answer short coaching follow-ups with the
+            previous turn's plan instead of planning them again
+        combine_review_calls: If True, reflect on each response and update memory
+            with one Gemini call instead of two
 
     Returns:
         Initialized Orchestrator instance and user data
@@ -27,7 +118,7 @@ def initialize_system(verbose=False):
         print("\nInitializing Personal Health Agent...")
 
     # Get mock user data
-    user_data = get_mock_user_data()
+    user_data = load_user_data()
 
     # Initialize agents
     ds_agent = DataScienceAgent(
@@ -42,19 +133,17 @@ def initialize_system(verbose=False):
         user_context=user_data['user_profile']
     )
 
+    # A dedicated pool for agent calls: process_query runs each query in a new event
+    # loop, which would otherwise start (and tear down) fresh default-executor threads
     orchestrator = Orchestrator(
         ds_agent=ds_agent,
         de_agent=de_agent,
         hc_agent=hc_agent,
-        initial_context={
-            'goals': [],
-            'conditions': [c['name'] for c in user_data['health_context']['health_records']['conditions']],
-            'medications': [m['name'] for m in user_data['health_context']['health_records']['medications']],
-            'lifestyle': {},
-            'key_metrics': [],
-            'action_items': [],
-            'progress_notes': []
-        }
+        initial_context=build_initial_context(user_data),
+        executor=ThreadPoolExecutor(max_workers=3, thread_name_prefix="pha-agent"),
+        speculative=speculative,
+        reuse_followup_plans=reuse_followup_plans,
+        combine_review_calls=combine_review_calls
     )
 
     if verbose:
@@ -71,28 +160,51 @@ def run_flow_mode(orchestrator: Orchestrator, query: str):
         orchestrator: Initialized Orchestrator instance
         query: User query to process
     """
-    print("\n" + "=" * 60)
-    print(f"QUERY: {query}")
-    print("=" * 60)
+    return asyncio.run(arun_flow_mode(orchestrator, query))
 
-    # Process the query
-    result = orchestrator.process_query(query)
-    plan = result['orchestration_plan']
 
-    # Show flow visualization
-    print("\n┌─ ORCHESTRATION FLOW")
-    print("│")
-    print(f"│  Intent: {plan.get('user_intent', 'N/A')}")
-    print(f"│  Main Agent: {plan.get('main_agent', 'N/A')}")
-    print(f"│  Supporting: {', '.join(plan.get('supporting_agents', []))}")
-    print("│")
+async def arun_flow_mode(orchestrator: Orchestrator, query: str):
+    """
+    Async variant of run_flow_mode that prints each stage of the flow as it completes.
 
-    # Show agent activity
-    print("├─ AGENT ACTIVITY")
-    for agent_name, task in plan.get('tasks', {}).items():
-        if task:
-            status = "✓" if agent_name in result['agent_responses'] else "○"
-            print(f"│  {status} {agent_name}: {task[:60]}...")
+    Args:
+        orchestrator: Initialized Orchestrator instance
+        query: User query to process
+    """
+    print("\n" + "=" * 60)
+    print(f"QUERY: {query}")
+    print("=" * 60, flush=True)
+
+    # Process the query, showing each stage as soon as it is done
+    plan = tasks = result = None
+    async for event in orchestrator.astream_query(query):
+        if event['phase'] == 'plan':
+            plan = event['plan']
+            tasks = plan.get('tasks', {})
+
+            # Show flow visualization
+            print("\n┌─ ORCHESTRATION FLOW")
+            print("│")
+            print(f"│  Intent: {plan.get('user_intent', 'N/A')}")
+            print(f"│  Main Agent: {plan.get('main_agent', 'N/A')}")
+            print(f"│  Supporting: {', '.join(plan.get('supporting_agents', []))}")
+            print("│")
+
+            # Show agent activity, in the order the agents finish
+            print("├─ AGENT ACTIVITY", flush=True)
+
+        elif event['phase'] == 'agent_done':
+            task = tasks.get(event['agent'])
+            if task:
+                print(f"│  ✓ {event['agent']}: {task[:60]}...", flush=True)
+
+        elif event['phase'] == 'result':
+            result = event['result']
+
+    # Tasks for agents that never ran
+    for agent_name, task in tasks.items():
+        if task and agent_name not in result['agent_responses']:
+            print(f"│  ○ {agent_name}: {task[:60]}...")
     print("│")
 
     # Show quality check
@@ -126,6 +238,10 @@ def run_interactive_mode(orchestrator: Orchestrator):
     print("─" * 60)
     print("\nCommands: 'quit' to exit | 'memory' to view context | 'summary' for stats\n")
 
+    # Prepare the agents while the user types their first question
+    threading.Thread(target=orchestrator.prefetch_context, daemon=True).start()
+
+    last_response = None
     while True:
         # Get user input
         user_input = input("You: ").strip()
@@ -139,20 +255,29 @@ def run_interactive_mode(orchestrator: Orchestrator):
             break
 
         if user_input.lower() == 'memory':
-            print("\n" + json.dumps(orchestrator.memory, indent=2) + "\n")
+            orchestrator.flush_memory()
+            print("\n" + dumps_pretty(orchestrator.memory) + "\n")
             continue
 
         if user_input.lower() == 'summary':
             summary = orchestrator.get_conversation_summary()
             print(f"\nTurns: {summary['total_turns']} | " +
+                  f"Plans reused: {summary['plans_reused']} | " +
                   f"Goals: {len(orchestrator.memory['goals'])} | " +
                   f"Actions: {len(orchestrator.memory['action_items'])}\n")
             continue
 
+        # Answer greetings and acknowledgements without running the agents
+        canned = _canned_reply(user_input, last_response)
+        if canned:
+            print(f"\nPHA: {canned}\n")
+            continue
+
         # Process the query
         try:
             result = orchestrator.process_query(user_input)
-            print(f"\nPHA: {result['response']}\n")
+            last_response = result['response']
+            print(f"\nPHA: {last_response}\n")
         except Exception as e:
             print(f"\n✗ Error: {e}\n")
             print("Please try again or type 'quit' to exit.\n")
@@ -178,6 +303,7 @@ def run_single_mode(unified_agent):
     print("─" * 60)
     print("\nCommands: 'quit' to exit | 'memory' to view context | 'summary' for stats\n")
 
+    last_response = None
     while True:
         # Get user input
         user_input = input("You: ").strip()
@@ -191,7 +317,8 @@ def run_single_mode(unified_agent):
             break
 
         if user_input.lower() == 'memory':
-            print("\n" + json.dumps(unified_agent.memory, indent=2) + "\n")
+            unified_agent.flush_memory()
+            print("\n" + dumps_pretty(unified_agent.memory) + "\n")
             continue
 
         if user_input.lower() == 'summary':
@@ -201,10 +328,21 @@ def run_single_mode(unified_agent):
                   f"Actions: {len(unified_agent.memory['action_items'])}\n")
             continue
 
-        # Process the query
+        # Answer greetings and acknowledgements without running the agent
+        canned = _canned_reply(user_input, last_response)
+        if canned:
+            print(f"\nPHA: {canned}\n")
+            continue
+
+        # Process the query, printing the response as it arrives
         try:
-            result = unified_agent.process_query(user_input)
-            print(f"\nPHA: {result['response']}\n")
+            print("\nPHA: ", end="", flush=True)
+            chunks = []
+            for chunk in unified_agent.stream_query(user_input):
+                chunks.append(chunk)
+                print(chunk, end="", flush=True)
+            print("\n")
+            last_response = "".join(chunks)
         except Exception as e:
             print(f"\n✗ Error: {e}\n")
             print("Please try again or type 'quit' to exit.\n")
@@ -224,31 +362,122 @@ def run_comparison_mode(query: str, user_data: Dict[str, Any]):
     comparison.run_single_query_comparison(query)
 
 
-def main():
+def _start_interactive(orchestrator: Orchestrator, user_data: Dict[str, Any], args: argparse.Namespace):
+    print(f"✓ Mode: Interactive (Multi-Agent)")
+    run_interactive_mode(orchestrator)
+
+
+def _start_flow(orchestrator: Orchestrator, user_data: Dict[str, Any], args: argparse.Namespace):
+    print(f"✓ Mode: Flow Visualization\n")
+    run_flow_mode(orchestrator, args.query or get_sample_queries()[0])
+
+
+def _start_single(orchestrator: Orchestrator, user_data: Dict[str, Any], args: argparse.Namespace):
+    print(f"✓ Mode: Single Agent (Baseline)")
+    from unified_agent import UnifiedAgent
+    # Memory updates run in the background while the user reads the response
+    unified_agent = UnifiedAgent(
+        user_data,
+        executor=ThreadPoolExecutor(max_workers=1, thread_name_prefix="pha-memory"),
+        skip_trivial_memory_updates=args.skip_trivial_memory
+    )
+    run_single_mode(unified_agent)
+
+
+def _start_compare(orchestrator: Orchestrator, user_data: Dict[str, Any], args: argparse.Namespace):
+    print(f"✓ Mode: Comparison")
+    run_comparison_mode(args.query or get_sample_queries()[0], user_data)
+
+
+# Modes that need the initialized system; 'data' only prints the mock data
+MODES = {
+    'interactive': _start_interactive,
+    'flow': _start_flow,
+    'single': _start_single,
+    'compare': _start_compare,
+}
+_MODE_ALIASES = {'i': 'interactive', 'f': 'flow', 's': 'single', 'c': 'compare'}
+
+_USAGE_EPILOG = """\
+Modes:
+  interactive  - Multi-agent conversational mode (default)
+  flow         - Show agent orchestration flow
+  single       - Single unified agent mode (baseline comparison)
+  compare      - Compare multi-agent vs single-agent on a query
+  data         - Display mock data summary
+
+Examples:
+  python main.py
+  python main.py interactive
+  python main.py flow "How has my sleep been?"
+  python main.py single
+  python main.py single --skip-trivial-memory
+  python main.py compare "Analyze my heart rate trends"
+  python main.py interactive --speculative --reuse-plans
+  python main.py interactive --combine-review
+  python main.py data
+"""
+
+_PARSER = argparse.ArgumentParser(
+    description="Personal Health Agent - Multi-Agent System\nBased on arXiv 2508.20148",
+    epilog=_USAGE_EPILOG,
+    formatter_class=argparse.RawDescriptionHelpFormatter
+)
+_PARSER.add_argument('mode', nargs='?', type=str.lower, metavar='mode',
+                     choices=[*MODES, 'data', *_MODE_ALIASES],
+                     help="operating mode (default: interactive)")
+_PARSER.add_argument('query', nargs='*',
+                     help="query for flow and compare modes (default: first sample query)")
+_PARSER.add_argument('--speculative', action='store_true',
+                     help="multi-agent modes: start the Domain Expert while the query is being "
+                          "planned, trading extra tokens for latency")
+_PARSER.add_argument('--reuse-plans', action='store_true',
+                     help="multi-agent modes: skip planning for short coaching follow-ups, "
+                          "reusing the previous turn's plan")
+_PARSER.add_argument('--combine-review', action='store_true',
+                     help="multi-agent modes: reflect on the response and update memory in "
+                          "one Gemini call instead of two")
+_PARSER.add_argument('--skip-trivial-memory', action='store_true',
+                     help="single mode: skip the memory-update call for turns that mention "
+                          "no goals, health topics or personal details")
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the mode and optional query from the command line."""
+    args = _PARSER.parse_args(argv)
+    if args.mode is None:
+        # Launched without arguments: show the usage, then start the default mode
+        _PARSER.print_help()
+        print()
+        args.mode = 'interactive'
+    args.mode = _MODE_ALIASES.get(args.mode, args.mode)
+    args.query = ' '.join(args.query) or None
+    return args
+
+
+def main(argv: Optional[List[str]] = None):
     """Main entry point for the PHA system."""
 
     # Parse command line arguments
-    mode = 'interactive'  # Default mode
-    query = None
-
-    if len(sys.argv) > 1:
-        mode = sys.argv[1].lower()
-        # For flow mode, allow passing a query
-        if mode == 'flow' and len(sys.argv) > 2:
-            query = ' '.join(sys.argv[2:])
+    args = _parse_args(argv)
 
     # Handle data mode separately (no initialization needed)
-    if mode == 'data':
+    if args.mode == 'data':
         run_data_mode()
         return
 
     # Initialize system (verbose only for flow mode)
-    verbose = mode == 'flow'
+    verbose = args.mode == 'flow'
     if verbose:
         print("\n✓ Initializing...")
 
     try:
-        orchestrator, user_data = initialize_system(verbose=verbose)
+        orchestrator, user_data = initialize_system(
+            verbose=verbose,
+            speculative=args.speculative,
+            reuse_followup_plans=args.reuse_plans,
+            combine_review_calls=args.combine_review
+        )
         if verbose:
             print("✓ System ready")
     except Exception as e:
@@ -259,62 +488,10 @@ def main():
         print("  3. Set API key: export GOOGLE_API_KEY='your-key-here'")
         return
 
-    if mode == 'interactive' or mode == 'i':
-        print(f"✓ Mode: Interactive (Multi-Agent)")
-        run_interactive_mode(orchestrator)
-
-    elif mode == 'flow' or mode == 'f':
-        print(f"✓ Mode: Flow Visualization\n")
-        # Use provided query or default sample query
-        if not query:
-            sample_queries = get_sample_queries()
-            query = sample_queries[0]
-        run_flow_mode(orchestrator, query)
-
-    elif mode == 'single' or mode == 's':
-        print(f"✓ Mode: Single Agent (Baseline)")
-        from unified_agent import UnifiedAgent
-        unified_agent = UnifiedAgent(user_data)
-        run_single_mode(unified_agent)
-
-    elif mode == 'compare' or mode == 'c':
-        print(f"✓ Mode: Comparison")
-        # Get query from command line or use sample
-        if len(sys.argv) > 2:
-            query = ' '.join(sys.argv[2:])
-        else:
-            sample_queries = get_sample_queries()
-            query = sample_queries[0]
-        run_comparison_mode(query, user_data)
-
-    else:
-        print(f"\n✗ Unknown mode: {mode}")
-        print("Valid modes: interactive (default), flow, data, single, compare")
-        sys.exit(1)
+    MODES[args.mode](orchestrator, user_data, args)
 
 
 if __name__ == "__main__":
-    # Show usage only if no arguments or invalid mode
-    valid_modes = ['interactive', 'i', 'flow', 'f', 'data', 'single', 's', 'compare', 'c']
-    if len(sys.argv) == 1 or (len(sys.argv) > 1 and sys.argv[1] not in valid_modes):
-        print("\nPersonal Health Agent - Multi-Agent System")
-        print("Based on arXiv 2508.20148\n")
-        print("Usage: python main.py [mode] [options]")
-        print("\nModes:")
-        print("  interactive  - Multi-agent conversational mode (default)")
-        print("  flow         - Show agent orchestration flow")
-        print("  single       - Single unified agent mode (baseline comparison)")
-        print("  compare      - Compare multi-agent vs single-agent on a query")
-        print("  data         - Display mock data summary")
-        print("\nExamples:")
-        print("  python main.py")
-        print("  python main.py interactive")
-        print("  python main.py flow \"How has my sleep been?\"")
-        print("  python main.py single")
-        print("  python main.py compare \"Analyze my heart rate trends\"")
-        print("  python main.py data")
-        print()
-
     try:
         main()
     except KeyboardInterrupt:
@@ -0,0 +1,102 @@
+"""
+Conversation-memory helpers shared by the Orchestrator and the UnifiedAgent.
+
+Both systems keep memory as a dict of entity lists plus a 'lifestyle' dict, and
+merge in the entities a memory-update prompt extracts after each turn. Entries are
+deduplicated against a per-list index of keys, so a merge never rescans the lists.
+"""
+
+from typing import Any, Dict, Set
+
+from json_utils import fingerprint
+
+# Memory entries that accumulate across turns, deduplicated on merge
+MEMORY_LIST_KEYS = ('goals', 'conditions', 'medications', 'key_metrics', 'action_items', 'progress_notes')
+# Entries kept per list; the oldest are dropped first
+MEMORY_LIST_MAX = 50
+
+
+def memory_item_key(item: Any) -> str:
+    """
+    Identity of a memory list entry, for deduplication.
+
+    Text is compared ignoring case and spacing, so "Improve sleep" and
+    "improve  Sleep" are the same entry. Anything else is keyed by its JSON digest,
+    which doesn't depend on dict key order.
+
+    Args:
+        item: A memory list entry
+
+    Returns:
+        The entry's dedup key
+    """
+    return " ".join(item.lower().split()) if isinstance(item, str) else fingerprint(item)
+
+
+def index_memory(memory: Dict[str, Any]) -> Dict[str, Set[str]]:
+    """
+    Build the dedup index for a memory dict: each list's entry keys.
+
+    Args:
+        memory: Conversation memory
+
+    Returns:
+        Set of memory_item_key values per list in MEMORY_LIST_KEYS
+    """
+    return {
+        key: {memory_item_key(item) for item in memory.get(key, [])}
+        for key in MEMORY_LIST_KEYS
+    }
+
+
+def merge_memory(memory: Dict[str, Any], seen: Dict[str, Set[str]], updated_memory: Any) -> bool:
+    """
+    Merge entities from a memory-update response into memory.
+
+    New list entries are appended, skipping any already indexed in `seen`; each list
+    then keeps its last MEMORY_LIST_MAX entries, and dropped entries leave the index
+    so they count as new if they come up again. Lists are replaced rather than
+    appended to in place, so memory built from a caller's dict doesn't alter it.
+    Lifestyle entries overwrite the existing ones. Malformed updates (not an
+    object, or fields of the wrong type) are ignored.
+
+    Args:
+        memory: Conversation memory, updated in place
+        seen: Its index from index_memory, kept in step with memory
+        updated_memory: The parsed memory-update response
+
+    Returns:
+        True if memory changed
+    """
+    if not isinstance(updated_memory, dict):
+        return False
+
+    changed = False
+    for key in MEMORY_LIST_KEYS:
+        items = updated_memory.get(key)
+        if not isinstance(items, list):
+            continue
+
+        index = seen[key]
+        new_items = []
+        for item in items:
+            item_key = memory_item_key(item)
+            if item_key not in index:
+                index.add(item_key)
+                new_items.append(item)
+        if not new_items:
+            continue
+
+        entries = memory.get(key, []) + new_items
+        # Forget the oldest entries past the cap; they count as new if repeated
+        for item in entries[:-MEMORY_LIST_MAX]:
+            index.discard(memory_item_key(item))
+        memory[key] = entries[-MEMORY_LIST_MAX:]
+        changed = True
+
+    lifestyle = updated_memory.get('lifestyle')
+    if isinstance(lifestyle, dict) and lifestyle:
+        memory.setdefault('lifestyle', {}).update(lifestyle)
+        changed = True
+
+    return changed
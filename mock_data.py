@@ -12,15 +12,18 @@ this provides a realistic substitute for development and testing.
 """
 
 from datetime import datetime, timedelta
+from functools import lru_cache
 import random
-from typing import Dict, Any, List
+import sys
+from typing import Dict, Any, List, Optional
 
 
 def generate_time_series(
     days: int = 30,
     base_value: float = 70,
     variance: float = 10,
-    daily_pattern: bool = True
+    daily_pattern: bool = True,
+    now: Optional[datetime] = None
 ) -> List[Dict[str, Any]]:
     """
     Generate mock time-series data for wearable metrics.
@@ -30,39 +33,37 @@ def generate_time_series(
         base_value: Average value
         variance: Standard deviation
         daily_pattern: Whether to add daily cyclical patterns
+        now: End of the series; the current time if not given
 
     Returns:
         List of timestamped data points
     """
-    data = []
-    start_date = datetime.now() - timedelta(days=days)
-
-    for day in range(days):
-        # Generate 24 hourly data points per day
-        for hour in range(24):
-            timestamp = start_date + timedelta(days=day, hours=hour)
-
-            # Add daily pattern (e.g., higher HR during day, lower at night)
-            if daily_pattern:
-                # Sine wave for daily cycle
-                daily_factor = 1 + 0.3 * ((hour - 12) / 12)
-            else:
-                daily_factor = 1
-
-            value = base_value * daily_factor + random.gauss(0, variance)
-
-            data.append({
-                'timestamp': timestamp.isoformat(),
-                'value': round(value, 2)
-            })
+    start_date = (now or datetime.now()) - timedelta(days=days)
+    one_hour = timedelta(hours=1)
+    gauss = random.gauss
+
+    # Add daily pattern (e.g., higher HR during day, lower at night), one factor per hour
+    if daily_pattern:
+        daily_factors = [1 + 0.3 * ((hour - 12) / 12) for hour in range(24)]
+    else:
+        daily_factors = [1] * 24
+
+    # Generate 24 hourly data points per day
+    data = [
+        {
+            'timestamp': (start_date + i * one_hour).isoformat(),
+            'value': round(base_value * daily_factors[i % 24] + gauss(0, variance), 2)
+        }
+        for i in range(days * 24)
+    ]
 
     return data
 
 
-def generate_sleep_data(days: int = 30) -> List[Dict[str, Any]]:
-    """Generate mock sleep data."""
+def generate_sleep_data(days: int = 30, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Generate mock sleep data ending at `now` (default: current time)."""
     sleep_data = []
-    start_date = datetime.now() - timedelta(days=days)
+    start_date = (now or datetime.now()) - timedelta(days=days)
 
     for day in range(days):
         # Randomize sleep duration around 7-8 hours
@@ -84,10 +85,10 @@ def generate_sleep_data(days: int = 30) -> List[Dict[str, Any]]:
     return sleep_data
 
 
-def generate_activity_data(days: int = 30) -> List[Dict[str, Any]]:
-    """Generate mock daily activity data."""
+def generate_activity_data(days: int = 30, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Generate mock daily activity data ending at `now` (default: current time)."""
     activity_data = []
-    start_date = datetime.now() - timedelta(days=days)
+    start_date = (now or datetime.now()) - timedelta(days=days)
 
     for day in range(days):
         # Weekday vs weekend pattern
@@ -113,100 +114,108 @@ def generate_activity_data(days: int = 30) -> List[Dict[str, Any]]:
 # COMPLETE MOCK USER DATA
 # ============================================================================
 
-MOCK_USER_DATA = {
-    # Personal profile
-    'user_profile': {
-        'user_id': 'user_001',
-        'age': 35,
-        'gender': 'male',
-        'height_cm': 178,
-        'weight_kg': 82,
-        'timezone': 'America/Los_Angeles',
-        'activity_level': 'moderately_active'
-    },
-
-    # Health context
-    'health_context': {
-        'health_profile': {
+@lru_cache(maxsize=1)
+def _build_mock_user_data() -> Dict[str, Any]:
+    """Build the complete mock user data on first use rather than at import."""
+    # One timestamp for the whole dataset, so every series ends at the last sync
+    now = datetime.now()
+
+    return {
+        # Personal profile
+        'user_profile': {
+            'user_id': 'user_001',
             'age': 35,
             'gender': 'male',
             'height_cm': 178,
             'weight_kg': 82,
-            'bmi': 25.9
+            'timezone': 'America/Los_Angeles',
+            'activity_level': 'moderately_active'
         },
-        'health_records': {
-            'conditions': [
-                {
-                    'name': 'Pre-hypertension',
-                    'diagnosed_date': '2023-03-15',
-                    'status': 'monitoring'
-                }
-            ],
-            'medications': [
-                {
-                    'name': 'Vitamin D3',
-                    'dosage': '2000 IU',
-                    'frequency': 'daily',
-                    'started_date': '2023-01-10'
-                }
-            ],
-            'allergies': ['penicillin'],
-            'family_history': [
-                'Type 2 Diabetes (father)',
-                'Hypertension (mother)'
-            ]
+
+        # Health context
+        'health_context': {
+            'health_profile': {
+                'age': 35,
+                'gender': 'male',
+                'height_cm': 178,
+                'weight_kg': 82,
+                'bmi': 25.9
+            },
+            'health_records': {
+                'conditions': [
+                    {
+                        'name': 'Pre-hypertension',
+                        'diagnosed_date': '2023-03-15',
+                        'status': 'monitoring'
+                    }
+                ],
+                'medications': [
+                    {
+                        'name': 'Vitamin D3',
+                        'dosage': '2000 IU',
+                        'frequency': 'daily',
+                        'started_date': '2023-01-10'
+                    }
+                ],
+                'allergies': ['penicillin'],
+                'family_history': [
+                    'Type 2 Diabetes (father)',
+                    'Hypertension (mother)'
+                ]
+            },
+            'wearable_data': {
+                'heart_rate_resting_avg': 72,
+                'sleep_avg_hours': 7.2,
+                'steps_avg_daily': 9500,
+                'last_sync': now.isoformat()
+            }
         },
-        'wearable_data': {
-            'heart_rate_resting_avg': 72,
-            'sleep_avg_hours': 7.2,
-            'steps_avg_daily': 9500,
-            'last_sync': datetime.now().isoformat()
-        }
-    },
-
-    # Detailed wearable data for DS agent
-    'personal_data': {
-        'time_range': '30 days',
-        'wearable_data': {
-            'heart_rate': generate_time_series(
-                days=30,
-                base_value=72,
-                variance=8,
-                daily_pattern=True
-            ),
-            'sleep': generate_sleep_data(days=30),
-            'activity': generate_activity_data(days=30),
-            'heart_rate_variability': generate_time_series(
-                days=30,
-                base_value=45,
-                variance=8,
-                daily_pattern=False
-            )
+
+        # Detailed wearable data for DS agent
+        'personal_data': {
+            'time_range': '30 days',
+            'wearable_data': {
+                'heart_rate': generate_time_series(
+                    days=30,
+                    base_value=72,
+                    variance=8,
+                    daily_pattern=True,
+                    now=now
+                ),
+                'sleep': generate_sleep_data(days=30, now=now),
+                'activity': generate_activity_data(days=30, now=now),
+                'heart_rate_variability': generate_time_series(
+                    days=30,
+                    base_value=45,
+                    variance=8,
+                    daily_pattern=False,
+                    now=now
+                )
+            },
+            'metrics_summary': {
+                'avg_resting_heart_rate': 72,
+                'avg_sleep_hours': 7.2,
+                'avg_daily_steps': 9500,
+                'avg_hrv': 45,
+                'sleep_quality_trend': 'stable',
+                'activity_consistency': 'moderate'
+            }
         },
-        'metrics_summary': {
-            'avg_resting_heart_rate': 72,
-            'avg_sleep_hours': 7.2,
-            'avg_daily_steps': 9500,
-            'avg_hrv': 45,
-            'sleep_quality_trend': 'stable',
-            'activity_consistency': 'moderate'
-        }
-    },
-
-    # Lab results
-    'lab_results': {
-        'last_test_date': '2024-08-15',
-        'results': {
-            'cholesterol_total': {'value': 195, 'unit': 'mg/dL', 'reference': '< 200'},
-            'ldl_cholesterol': {'value': 120, 'unit': 'mg/dL', 'reference': '< 100'},
-            'hdl_cholesterol': {'value': 52, 'unit': 'mg/dL', 'reference': '> 40'},
-            'triglycerides': {'value': 115, 'unit': 'mg/dL', 'reference': '< 150'},
-            'glucose_fasting': {'value': 98, 'unit': 'mg/dL', 'reference': '70-100'},
-            'hba1c': {'value': 5.4, 'unit': '%', 'reference': '< 5.7'},
-            'vitamin_d': {'value': 28, 'unit': 'ng/mL', 'reference': '30-100'}
+
+        # Lab results
+        'lab_results': {
+            'last_test_date': '2024-08-15',
+            'results': {
+                'cholesterol_total': {'value': 195, 'unit': 'mg/dL', 'reference': '< 200'},
+                'ldl_cholesterol': {'value': 120, 'unit': 'mg/dL', 'reference': '< 100'},
+                'hdl_cholesterol': {'value': 52, 'unit': 'mg/dL', 'reference': '> 40'},
+                'triglycerides': {'value': 115, 'unit': 'mg/dL', 'reference': '< 150'},
+                'glucose_fasting': {'value': 98, 'unit': 'mg/dL', 'reference': '70-100'},
+                'hba1c': {'value': 5.4, 'unit': '%', 'reference': '< 5.7'},
+                'vitamin_d': {'value': 28, 'unit': 'ng/mL', 'reference': '30-100'}
+            }
         }
     }
-}
 
 
 # ============================================================================
@@ -239,7 +248,14 @@ def get_mock_user_data() -> Dict[str, Any]:
     Returns:
         Dictionary with all mock user data
     """
-    return MOCK_USER_DATA
+    return _build_mock_user_data()
+
+
+def __getattr__(name: str) -> Any:
+    # MOCK_USER_DATA used to be a module-level dict; keep it importable
+    if name == 'MOCK_USER_DATA':
+        return _build_mock_user_data()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_sample_queries() -> List[str]:
@@ -252,42 +268,52 @@ def get_sample_queries() -> List[str]:
     return SAMPLE_QUERIES
 
 
-def print_data_summary():
-    """Print a summary of the mock data for reference."""
-    print("=" * 80)
-    print("MOCK USER DATA SUMMARY")
-    print("=" * 80)
+@lru_cache(maxsize=1)
+def _render_data_summary() -> str:
+    """Render the data summary once; the mock data does not change after it is built."""
+    user_data = get_mock_user_data()
+    bar = "=" * 80
 
-    print("\n📊 USER PROFILE")
-    print(f"  Age: {MOCK_USER_DATA['user_profile']['age']}")
-    print(f"  Gender: {MOCK_USER_DATA['user_profile']['gender']}")
-    print(f"  Height: {MOCK_USER_DATA['user_profile']['height_cm']} cm")
-    print(f"  Weight: {MOCK_USER_DATA['user_profile']['weight_kg']} kg")
+    lines = [
+        bar,
+        "MOCK USER DATA SUMMARY",
+        bar,
 
-    print("\n🏥 HEALTH CONDITIONS")
-    for condition in MOCK_USER_DATA['health_context']['health_records']['conditions']:
-        print(f"  - {condition['name']} ({condition['status']})")
+        "\n📊 USER PROFILE",
+        f"  Age: {user_data['user_profile']['age']}",
+        f"  Gender: {user_data['user_profile']['gender']}",
+        f"  Height: {user_data['user_profile']['height_cm']} cm",
+        f"  Weight: {user_data['user_profile']['weight_kg']} kg",
 
-    print("\n💊 MEDICATIONS")
-    for med in MOCK_USER_DATA['health_context']['health_records']['medications']:
-        print(f"  - {med['name']} ({med['dosage']}, {med['frequency']})")
+        "\n🏥 HEALTH CONDITIONS"
+    ]
+    for condition in user_data['health_context']['health_records']['conditions']:
+        lines.append(f"  - {condition['name']} ({condition['status']})")
 
-    print("\n⌚ WEARABLE DATA (30 days)")
-    hr_data = MOCK_USER_DATA['personal_data']['wearable_data']['heart_rate']
-    print(f"  - Heart Rate: {len(hr_data)} measurements")
+    lines.append("\n💊 MEDICATIONS")
+    for med in user_data['health_context']['health_records']['medications']:
+        lines.append(f"  - {med['name']} ({med['dosage']}, {med['frequency']})")
 
-    sleep_data = MOCK_USER_DATA['personal_data']['wearable_data']['sleep']
-    print(f"  - Sleep: {len(sleep_data)} nights")
+    wearable_data = user_data['personal_data']['wearable_data']
+    lines.extend((
+        "\n⌚ WEARABLE DATA (30 days)",
+        f"  - Heart Rate: {len(wearable_data['heart_rate'])} measurements",
+        f"  - Sleep: {len(wearable_data['sleep'])} nights",
+        f"  - Activity: {len(wearable_data['activity'])} days",
 
-    activity_data = MOCK_USER_DATA['personal_data']['wearable_data']['activity']
-    print(f"  - Activity: {len(activity_data)} days")
+        "\n🧪 LAB RESULTS",
+        f"  Last test: {user_data['lab_results']['last_test_date']}"
+    ))
+    for test, result in user_data['lab_results']['results'].items():
+        lines.append(f"  - {test}: {result['value']} {result['unit']} (ref: {result['reference']})")
 
-    print("\n🧪 LAB RESULTS")
-    print(f"  Last test: {MOCK_USER_DATA['lab_results']['last_test_date']}")
-    for test, result in MOCK_USER_DATA['lab_results']['results'].items():
-        print(f"  - {test}: {result['value']} {result['unit']} (ref: {result['reference']})")
+    lines.append("\n" + bar)
+    return "\n".join(lines) + "\n"
 
-    print("\n" + "=" * 80)
+
+def print_data_summary():
+    """Print a summary of the mock data for reference."""
+    sys.stdout.write(_render_data_summary())
 
 
 if __name__ == "__main__":
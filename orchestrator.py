@@ -5,17 +5,112 @@ The Orchestrator coordinates three specialized agents (DS, DE, HC) to provide
 comprehensive health insights through a structured 4-step process.
 """
 
-from api_client import call_gemini
+from api_client import call_gemini, create_cached_context, GeminiAPIError, hash_system_prompt
+from json_utils import dumps_pretty, extract_json
+from memory_utils import index_memory, merge_memory
 from agents import DataScienceAgent, DomainExpertAgent, HealthCoachAgent
 from prompts import (
     get_agent_prompt,
     ORCHESTRATOR_TASK_ASSIGNMENT_PROMPT,
     ORCHESTRATOR_REFLECTION_PROMPT,
     ORCHESTRATOR_MEMORY_UPDATE_PROMPT,
+    ORCHESTRATOR_REFLECT_AND_MEMORY_PROMPT,
     render_prompt
 )
+import asyncio
+import copy
+import functools
+import itertools
 import json
-from typing import Dict, Any, List, Optional
+import logging
+import re
+from collections import deque
+from concurrent.futures import Executor, Future
+from functools import cached_property
+from typing import Dict, Any, AsyncIterator, Callable, Deque, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# Agents a plan's invocations can dispatch to
+_AGENTS = ('DS', 'DE', 'HC')
+
+
+def _read_invocations(invocations: Any) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+    """
+    The {agent: task} map for a plan's invocations, and each agent's declared
+    dependencies where it gave them, skipping malformed entries.
+    """
+    tasks, depends_on = {}, {}
+    if not isinstance(invocations, list):
+        return tasks, depends_on
+    for invocation in invocations:
+        if not isinstance(invocation, dict):
+            continue
+        agent, task = invocation.get('agent'), invocation.get('task')
+        if agent in _AGENTS and task and isinstance(task, str):
+            # An agent invoked more than once gets all of its tasks in one call
+            tasks[agent] = f"{tasks[agent]}\n{task}" if agent in tasks else task
+            needs = invocation.get('depends_on')
+            if isinstance(needs, list):
+                depends_on.setdefault(agent, []).extend(a for a in needs if a in _AGENTS)
+    return tasks, depends_on
+
+
+def _de_needs_ds(plan: Dict[str, Any]) -> bool:
+    """Whether DE should build on the DS analysis plan: yes unless the plan says otherwise."""
+    depends_on = plan.get('depends_on')
+    if not isinstance(depends_on, dict) or not isinstance(depends_on.get('DE'), list):
+        return True
+    return 'DS' in depends_on['DE']
+
+
+def _approved_reflection() -> Dict[str, Any]:
+    """The reflection used when the review step gives no usable verdict."""
+    return {
+        'approved': True,
+        'issues': [],
+        'suggested_improvements': ''
+    }
+
+
+# A follow-up mentioning any of these may need DS or DE, so it is always planned afresh
+_REPLAN_TOPICS = re.compile(
+    r"data|chart|graph|number|stat|trend|average|analy|compar|sleep|step|heart|weight|"
+    r"medic|diagnos|symptom|lab|blood|glucose|pressure|cholesterol|test|result",
+    re.IGNORECASE
+)
+# Follow-ups longer than this are planned afresh, as they likely change the subject
+_FOLLOWUP_MAX_CHARS = 80
+
+
+def _insights_text(response: Any) -> str:
+    """An agent response as prompt text: strings as-is, structured output as JSON."""
+    if not response or isinstance(response, str):
+        return response or ''
+    return dumps_pretty(response)
+
+
+def _ds_response_text(response: Dict[str, Any]) -> str:
+    """User-facing text of a DS result: its analysis plan."""
+    return f"Based on my analysis:\n\n{response.get('analysis_plan', '')}"
+
+
+# Text of a main agent's structured (dict) response, by agent; others are shown as JSON
+_RESPONSE_TEXT = {
+    'DS': _ds_response_text
+}
+
+
+def _response_text(agent: str, response: Any) -> str:
+    """An agent's response as user-facing text."""
+    if isinstance(response, str):
+        return response
+    if isinstance(response, dict):
+        if 'error' in response:
+            return f"I encountered an issue: {response['error']}"
+        return _RESPONSE_TEXT.get(agent, dumps_pretty)(response)
+    return str(response)
 
 
 class Orchestrator:
@@ -34,7 +129,11 @@ class Orchestrator:
         ds_agent: DataScienceAgent,
         de_agent: DomainExpertAgent,
         hc_agent: HealthCoachAgent,
-        initial_context: Optional[Dict[str, Any]] = None
+        initial_context: Optional[Dict[str, Any]] = None,
+        executor: Optional[Executor] = None,
+        combine_review_calls: bool = False,
+        speculative: bool = False,
+        reuse_followup_plans: bool = False
     ):
         """
         Initialize the Orchestrator with three specialized agents.
@@ -44,13 +143,49 @@ class Orchestrator:
             de_agent: Domain Expert Agent instance
             hc_agent: Health Coach Agent instance
             initial_context: Optional initial context/memory
+            executor: Thread pool for the blocking agent calls; asyncio's default
+                executor if not given
+            combine_review_calls: Reflect on the response and update memory with a
+                single Gemini call instead of two
+            speculative: Start the DE agent while the plan is still being made, and
+                discard its answer if the plan does not call for it
+            reuse_followup_plans: Skip Step 1 for a short follow-up to a turn led by
+                the Health Coach that raises no data or medical topic, reusing that
+                turn's plan
         """
         self.ds_agent = ds_agent
         self.de_agent = de_agent
         self.hc_agent = hc_agent
-
-        # Conversation memory
-        self.memory = initial_context or {
+        self.executor = executor
+        self.combine_review_calls = combine_review_calls
+        self.speculative = speculative
+        self.reuse_followup_plans = reuse_followup_plans
+
+        # Conversation memory. _memory_version counts merges that changed it, so
+        # its JSON form is only re-serialized when needed
+        self.memory = initial_context or self._empty_memory()
+        self._memory_version = 0
+        self._memory_json_version = -1
+        self._index_memory()
+
+        # Prompts show at most the last 5 turns (user + assistant pairs), so keep no
+        # more than that; each turn's entities already live on in memory
+        self.conversation_history: Deque[Dict[str, str]] = deque(maxlen=10)
+        # The same turns as "Role: content" prompt lines, formatted once when added
+        self._history_lines: Deque[str] = deque(maxlen=10)
+        self._turn_count = 0
+
+        # Step 4 of the last query, if it is still running on the executor
+        self._pending_memory_update: Optional[Future] = None
+
+        # The previous turn's plan, and how many turns reused one instead of planning
+        self._last_plan: Optional[Dict[str, Any]] = None
+        self._plans_reused = 0
+
+    @staticmethod
+    def _empty_memory() -> Dict[str, Any]:
+        """Memory structure for a user with no logged context yet."""
+        return {
             'goals': [],
             'conditions': [],
             'lifestyle': {},
@@ -60,13 +195,65 @@ class Orchestrator:
             'progress_notes': []
         }
 
-        self.conversation_history: List[Dict[str, str]] = []
+    @cached_property
+    def system_prompt(self) -> str:
+        """
+        System prompt for orchestration decisions, rendered on first use.
 
-        # System prompt for orchestration decisions
-        self.system_prompt = get_agent_prompt(
-            'ORCHESTRATOR',
-            context=json.dumps(self.memory, indent=2)
-        )
+        It holds no memory, so it never changes and Gemini's context cache and the
+        response cache keep hitting across turns and conversations. Prompts that
+        need memory carry its current state themselves.
+        """
+        return get_agent_prompt('ORCHESTRATOR')
+
+    @cached_property
+    def _system_prompt_hash(self) -> bytes:
+        """Response-cache digest of the system prompt, computed once."""
+        return hash_system_prompt(self.system_prompt)
+
+    @property
+    def _cached_content(self):
+        """Server-side context cache for the system prompt, re-registered as it expires."""
+        return create_cached_context(self.system_prompt, system_prompt_hash=self._system_prompt_hash)
+
+    def _index_memory(self):
+        """Record the entries already in each memory list, for _merge_memory's dedup."""
+        self._memory_seen = index_memory(self.memory)
+
+    @property
+    def _memory_json(self) -> str:
+        """self.memory as indented JSON, serialized once per memory version."""
+        if self._memory_json_version != self._memory_version:
+            self._memory_json_text = dumps_pretty(self.memory)
+            self._memory_json_version = self._memory_version
+        return self._memory_json_text
+
+    def reset_memory(self, initial_context: Optional[Dict[str, Any]] = None):
+        """
+        Start a new conversation with the same agents, without rebuilding them.
+
+        Args:
+            initial_context: Optional initial context/memory. It is copied, so the
+                             same dictionary can be reused across resets.
+        """
+        # Don't let the last query's memory update land in the new conversation
+        self.flush_memory()
+
+        self.memory = copy.deepcopy(initial_context) if initial_context else self._empty_memory()
+        self._memory_version += 1
+        self._index_memory()
+        self.conversation_history.clear()
+        self._history_lines.clear()
+        self._turn_count = 0
+        self._last_plan = None
+        self._plans_reused = 0
+        self.hc_agent.reset_conversation()
+
+    def flush_memory(self):
+        """Wait for the last query's background memory update, if any, to finish."""
+        pending, self._pending_memory_update = self._pending_memory_update, None
+        if pending is not None:
+            pending.result()
 
     def process_query(self, user_query: str) -> Dict[str, Any]:
         """
@@ -78,12 +265,151 @@ class Orchestrator:
         Returns:
             Dictionary containing the final response and metadata
         """
-        # Step 1: Understand user need
-        orchestration_plan = self.understand_user_need(user_query)
+        return asyncio.run(self.aprocess_query(user_query))
+
+    def prefetch_context(self):
+        """
+        Prepare the per-agent state that the first query would otherwise wait for.
+
+        Renders each agent's system prompt and registers it, and the orchestrator's
+        own, with Gemini's context cache. Meant to run in the background, e.g. while
+        the user types.
+        """
+        for agent in (self, self.ds_agent, self.de_agent, self.hc_agent):
+            # Renders and hashes the system prompt, then registers it
+            agent._cached_content
+
+    async def aprocess_query(self, user_query: str) -> Dict[str, Any]:
+        """Async variant of process_query, for callers that already run an event loop."""
+        return await self._arun_query(user_query)
+
+    async def astream_query(self, user_query: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a query like aprocess_query, yielding progress events as steps complete.
+
+        Args:
+            user_query: The user's health-related query
+
+        Yields:
+            {'phase': 'plan', 'plan': ...} once the orchestration plan is ready, then
+            {'phase': 'agent_done', 'agent': ..., 'output': ...} as each agent finishes,
+            and finally {'phase': 'result', 'result': ...} with the process_query result
+        """
+        events: asyncio.Queue = asyncio.Queue()
+
+        async def run():
+            try:
+                result = await self._arun_query(user_query, events.put_nowait)
+                events.put_nowait({'phase': 'result', 'result': result})
+            finally:
+                events.put_nowait(None)
+
+        task = asyncio.create_task(run())
+        try:
+            while (event := await events.get()) is not None:
+                yield event
+            await task  # Re-raise a failure
+        finally:
+            # Stop the pipeline if the consumer stops early; a no-op once it has finished
+            task.cancel()
+
+    async def _arun_query(
+        self,
+        user_query: str,
+        emit: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """Run the 4-step process, passing progress events to `emit` if given."""
+        # DE's answer to a plan-independent task depends only on the query, so it can
+        # start before the plan (or the previous turn's memory update) is in
+        speculative_de = None
+        if self.speculative:
+            speculative_de = asyncio.ensure_future(self._run_blocking(
+                self.de_agent.synthesize_insights, user_query=user_query, ds_analysis=None
+            ))
+            # Mark a failure as seen in case the plan discards it unawaited
+            speculative_de.add_done_callback(
+                lambda future: future.cancelled() or future.exception()
+            )
 
-        # Step 2: Orchestrate agents
-        agent_responses = self.orchestrate_agents(user_query, orchestration_plan)
+        try:
+            # The previous turn's memory update may still be running
+            pending, self._pending_memory_update = self._pending_memory_update, None
+            if pending is not None:
+                await asyncio.wrap_future(pending)
+
+            # Step 1: Understand user need, unless this is a plain coaching follow-up
+            if self._can_reuse_plan(user_query):
+                orchestration_plan = self._last_plan
+                self._plans_reused += 1
+            else:
+                orchestration_plan = await self._run_blocking(self.understand_user_need, user_query)
+            self._last_plan = orchestration_plan
+        except BaseException:
+            if speculative_de is not None:
+                speculative_de.cancel()
+            raise
+
+        on_agent_done = None
+        if emit is not None:
+            emit({'phase': 'plan', 'plan': orchestration_plan})
+
+            def on_agent_done(agent: str, output: Any):
+                emit({'phase': 'agent_done', 'agent': agent, 'output': output})
+
+        # Step 2: Orchestrate agents, running independent agents concurrently
+        agent_responses = await self.aorchestrate_agents(
+            user_query, orchestration_plan, on_agent_done=on_agent_done,
+            speculative_de=speculative_de
+        )
+
+        # Step 3: Synthesize and reflect on the response
+        result = await self._run_blocking(
+            self._finish_query, user_query, orchestration_plan, agent_responses
+        )
 
+        if self.combine_review_calls:
+            return result  # Memory was updated along with the reflection
+
+        # Step 4: Update memory. It does not change the response, so with a dedicated
+        # executor it runs in the background; the next query (or flush_memory) waits for it
+        if self.executor is None:
+            await self._run_blocking(self.update_memory, user_query, result['response'])
+        else:
+            self._pending_memory_update = self.executor.submit(
+                self._update_memory_in_background, user_query, result['response']
+            )
+
+        return result
+
+    def _update_memory_in_background(self, user_query: str, final_response: str):
+        """update_memory for the executor: a failure is logged, not re-raised by flush_memory."""
+        try:
+            self.update_memory(user_query, final_response)
+        except Exception as e:
+            logger.warning("Memory update failed; keeping the previous memory: %s", e)
+
+    def _can_reuse_plan(self, user_query: str) -> bool:
+        """Whether the previous turn's plan can stand in for planning this query."""
+        return (
+            self.reuse_followup_plans
+            and self._last_plan is not None
+            and self._last_plan.get('main_agent') == 'HC'
+            and len(user_query) <= _FOLLOWUP_MAX_CHARS
+            and not _REPLAN_TOPICS.search(user_query)
+        )
+
+    async def _run_blocking(self, fn, *args, **kwargs):
+        """Run a blocking agent or LLM call on the orchestrator's executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+    def _finish_query(
+        self,
+        user_query: str,
+        orchestration_plan: Dict[str, Any],
+        agent_responses: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Synthesize, reflect on and record the response once the agents have answered."""
         # Synthesize response
         final_response = self._synthesize_response(
             user_query,
@@ -91,8 +417,12 @@ class Orchestrator:
             agent_responses
         )
 
-        # Step 3: Reflect on response
-        reflection_result = self.reflect_on_response(
+        # Step 3: Reflect on response (and do step 4 in the same call if combining them)
+        if self.combine_review_calls:
+            review = self._reflect_and_update_memory
+        else:
+            review = self.reflect_on_response
+        reflection_result = review(
             user_query,
             orchestration_plan,
             agent_responses,
@@ -106,18 +436,14 @@ class Orchestrator:
                 reflection_result.get('suggested_improvements', '')
             )
 
-        # Step 4: Update memory
-        self.update_memory(user_query, final_response)
-
         # Add to conversation history
-        self.conversation_history.append({
-            'role': 'user',
-            'content': user_query
-        })
-        self.conversation_history.append({
-            'role': 'assistant',
-            'content': final_response
-        })
+        for role, content in (('user', user_query), ('assistant', final_response)):
+            self.conversation_history.append({
+                'role': role,
+                'content': content
+            })
+            self._history_lines.append(f"{role.capitalize()}: {content}")
+        self._turn_count += 1
 
         return {
             'query': user_query,
@@ -136,28 +462,42 @@ class Orchestrator:
             user_query: The user's query
 
         Returns:
-            Orchestration plan with main/supporting agents and tasks
+            Orchestration plan with main/supporting agents, their invocations, the
+            invocations' tasks by agent under 'tasks', and the agents each one
+            declared it builds on under 'depends_on'
         """
         conversation_summary = self._format_conversation_history()
-        user_context_summary = json.dumps(self.memory, indent=2)
 
         user_prompt = render_prompt(
             ORCHESTRATOR_TASK_ASSIGNMENT_PROMPT,
             user_query=user_query,
-            conversation_history=conversation_summary
-        )
-
-        response = call_gemini(
-            system_prompt=self.system_prompt,
-            user_prompt=user_prompt,
-            temperature=0.3
+            conversation_history=conversation_summary,
+            current_memory=self._memory_json
         )
 
-        # Parse JSON response
+        # Plan and parse the JSON response
         try:
-            plan = self._extract_json(response)
-        except json.JSONDecodeError:
-            # Fallback: basic orchestration if JSON parsing fails
+            response = call_gemini(
+                system_prompt=self.system_prompt,
+                cached_content=self._cached_content,
+                system_prompt_hash=self._system_prompt_hash,
+                user_prompt=user_prompt,
+                temperature=0.3
+            )
+            plan = extract_json(response)
+        except (json.JSONDecodeError, GeminiAPIError):
+            plan = None
+
+        # The plan lists agent invocations, possibly as a bare array; the dispatcher
+        # runs them as tasks by agent
+        if isinstance(plan, list):
+            plan = {'invocations': plan}
+        if isinstance(plan, dict) and 'tasks' not in plan:
+            plan['tasks'], plan['depends_on'] = _read_invocations(plan.get('invocations'))
+
+        tasks = plan['tasks'] if isinstance(plan, dict) else None
+        if not (isinstance(tasks, dict) and any(tasks.values())):
+            # Fallback: basic orchestration if planning fails or the plan runs no agent
             plan = {
                 'user_intent': 'General health query',
                 'main_agent': 'HC',
@@ -185,63 +525,133 @@ class Orchestrator:
         Returns:
             Dictionary of agent responses
         """
+        return asyncio.run(self.aorchestrate_agents(user_query, orchestration_plan))
+
+    async def aorchestrate_agents(
+        self,
+        user_query: str,
+        orchestration_plan: Dict[str, Any],
+        on_agent_done: Optional[Callable[[str, Any], None]] = None,
+        speculative_de: Optional[asyncio.Future] = None
+    ) -> Dict[str, Any]:
+        """
+        Async variant of orchestrate_agents.
+
+        DE only needs the DS analysis plan, so it runs alongside DS code generation,
+        and from the start if the plan declares that its task does not depend on DS
+        (an empty 'depends_on' for DE); HC waits for both. A failing agent is recorded as {'error': ...}. If given,
+        on_agent_done(agent, response) is called as each agent finishes.
+
+        speculative_de, if given, is a DE call started without a DS plan before the
+        plan was known. It is used when DE would have started from the beginning
+        anyway, and cancelled otherwise.
+        """
+        def finished(agent: str, response: Any) -> Any:
+            if on_agent_done is not None:
+                on_agent_done(agent, response)
+            return response
+
         agent_responses = {}
         tasks = orchestration_plan.get('tasks', {})
+        run_ds = bool(tasks.get('DS'))
+        run_de = bool(tasks.get('DE'))
 
-        # Execute DS agent tasks
-        if 'DS' in tasks and tasks['DS']:
+        async def run_ds_code(ds_plan: str):
             try:
-                ds_result = self.ds_agent.analyze_query(user_query)
-                agent_responses['DS'] = ds_result
+                analysis_code = await self._run_blocking(
+                    self.ds_agent.generate_analysis_code, ds_plan, user_query
+                )
             except Exception as e:
-                agent_responses['DS'] = {'error': str(e)}
-
-        # Execute DE agent tasks
-        if 'DE' in tasks and tasks['DE']:
+                return finished('DS', {'error': str(e)})
+            return finished('DS', {
+                'query': user_query,
+                'analysis_plan': ds_plan,
+                'analysis_code': analysis_code,
+                'status': 'code_generated'
+            })
+
+        async def run_de_task(ds_plan: Optional[str], started: Optional[asyncio.Future] = None):
             try:
-                # Check if we have DS insights to include
-                ds_insights = None
-                if 'DS' in agent_responses:
-                    ds_insights = agent_responses['DS'].get('analysis_plan', '')
-
-                de_result = self.de_agent.synthesize_insights(
-                    user_query=user_query,
-                    ds_analysis=ds_insights
-                )
-                agent_responses['DE'] = de_result
+                if started is not None:
+                    de_result = await started
+                else:
+                    de_result = await self._run_blocking(
+                        self.de_agent.synthesize_insights,
+                        user_query=user_query,
+                        ds_analysis=ds_plan
+                    )
             except Exception as e:
-                agent_responses['DE'] = {'error': str(e)}
+                de_result = {'error': str(e)}
+            return finished('DE', de_result)
+
+        early_de = None
+        if run_de and not (run_ds and _de_needs_ds(orchestration_plan)):
+            early_de = asyncio.ensure_future(run_de_task(None, speculative_de))
+        elif speculative_de is not None:
+            speculative_de.cancel()
+
+        try:
+            # DS stage 1: the analysis plan, which DE builds on
+            ds_plan = None
+            if run_ds:
+                try:
+                    ds_plan = await self._run_blocking(
+                        self.ds_agent.generate_analysis_plan, user_query
+                    )
+                except Exception as e:
+                    agent_responses['DS'] = finished('DS', {'error': str(e)})
+
+            # DS stage 2 and DE run concurrently
+            branches = {}
+            if ds_plan is not None:
+                branches['DS'] = run_ds_code(ds_plan)
+            if run_de:
+                branches['DE'] = early_de if early_de is not None else run_de_task(ds_plan)
+            results = await asyncio.gather(*branches.values())
+            agent_responses.update(zip(branches, results))
+        finally:
+            if early_de is not None:
+                early_de.cancel()  # Only has an effect if DS planning was interrupted
 
         # Execute HC agent tasks
         if 'HC' in tasks and tasks['HC']:
-            try:
-                # Gather insights from other agents
-                health_insights = {
-                    'ds': agent_responses.get('DS'),
-                    'de': agent_responses.get('DE')
-                }
+            agent_responses['HC'] = finished('HC', await self._run_blocking(
+                self._run_hc_task, user_query, tasks['HC'], agent_responses
+            ))
 
-                # Determine if this is goal identification or recommendation
-                if 'goal' in tasks['HC'].lower() or 'motivation' in tasks['HC'].lower():
-                    hc_result = self.hc_agent.identify_goals(
-                        user_message=user_query,
-                        health_insights=health_insights
-                    )
-                else:
-                    # Extract goals from memory
-                    user_goals = self.memory.get('goals', ['Improve overall health'])
+        return agent_responses
 
-                    hc_result = self.hc_agent.provide_recommendations(
-                        user_goals=user_goals,
-                        ds_insights=str(agent_responses.get('DS', '')),
-                        de_insights=str(agent_responses.get('DE', ''))
-                    )
+    def _run_hc_task(
+        self,
+        user_query: str,
+        hc_task: str,
+        agent_responses: Dict[str, Any]
+    ) -> Any:
+        """Run the HC agent's task on top of the DS and DE responses."""
+        try:
+            # Gather insights from other agents
+            health_insights = {
+                'ds': agent_responses.get('DS'),
+                'de': agent_responses.get('DE')
+            }
 
-                agent_responses['HC'] = hc_result
-            except Exception as e:
-                agent_responses['HC'] = {'error': str(e)}
+            # Determine if this is goal identification or recommendation
+            if 'goal' in hc_task.lower() or 'motivation' in hc_task.lower():
+                return self.hc_agent.identify_goals(
+                    user_message=user_query,
+                    health_insights=health_insights
+                )
 
-        return agent_responses
+            # Extract goals from memory
+            user_goals = self.memory.get('goals', ['Improve overall health'])
+
+            return self.hc_agent.provide_recommendations(
+                user_goals=user_goals,
+                ds_insights=_insights_text(agent_responses.get('DS')),
+                de_insights=_insights_text(agent_responses.get('DE'))
+            )
+        except Exception as e:
+            return {'error': str(e)}
 
     def reflect_on_response(
         self,
@@ -265,27 +675,28 @@ class Orchestrator:
         user_prompt = render_prompt(
             ORCHESTRATOR_REFLECTION_PROMPT,
             user_query=user_query,
-            orchestration_plan=json.dumps(orchestration_plan, indent=2),
-            agent_responses=json.dumps(agent_responses, indent=2),
-            proposed_response=proposed_response
+            orchestration_plan=dumps_pretty(orchestration_plan),
+            agent_responses=dumps_pretty(agent_responses),
+            proposed_response=proposed_response,
+            current_memory=self._memory_json
         )
 
-        response = call_gemini(
-            system_prompt=self.system_prompt,
-            user_prompt=user_prompt,
-            temperature=0.2
-        )
-
-        # Parse reflection result
+        # Run and parse the reflection
         try:
-            reflection = self._extract_json(response)
-        except json.JSONDecodeError:
-            # Default to approved if parsing fails
-            reflection = {
-                'approved': True,
-                'issues': [],
-                'suggested_improvements': ''
-            }
+            response = call_gemini(
+                system_prompt=self.system_prompt,
+                cached_content=self._cached_content,
+                system_prompt_hash=self._system_prompt_hash,
+                user_prompt=user_prompt,
+                temperature=0.2
+            )
+            reflection = extract_json(response)
+        except (json.JSONDecodeError, GeminiAPIError):
+            reflection = None
+
+        if not isinstance(reflection, dict):
+            # Default to approved if the review call fails or returns no JSON object
+            reflection = _approved_reflection()
 
         return reflection
 
@@ -304,35 +715,83 @@ class Orchestrator:
             ORCHESTRATOR_MEMORY_UPDATE_PROMPT,
             user_query=user_query,
             final_response=final_response,
-            current_memory=json.dumps(self.memory, indent=2)
+            current_memory=self._memory_json
         )
 
-        response = call_gemini(
-            system_prompt=self.system_prompt,
-            user_prompt=user_prompt,
-            temperature=0.3
-        )
+        try:
+            response = call_gemini(
+                system_prompt=self.system_prompt,
+                cached_content=self._cached_content,
+                system_prompt_hash=self._system_prompt_hash,
+                user_prompt=user_prompt,
+                temperature=0.3
+            )
+        except GeminiAPIError:
+            # Keep the existing memory if extraction fails this turn
+            return
 
         # Parse and update memory
         try:
-            updated_memory = self._extract_json(response)
-            # Merge with existing memory (don't overwrite, append)
-            for key in ['goals', 'conditions', 'medications', 'key_metrics', 'action_items', 'progress_notes']:
-                if key in updated_memory:
-                    if isinstance(updated_memory[key], list):
-                        # Add new items that aren't already present
-                        existing = set(str(item) for item in self.memory.get(key, []))
-                        new_items = [item for item in updated_memory[key] if str(item) not in existing]
-                        self.memory[key] = self.memory.get(key, []) + new_items
-
-            # For lifestyle (dict), merge
-            if 'lifestyle' in updated_memory:
-                self.memory['lifestyle'].update(updated_memory['lifestyle'])
-
+            self._merge_memory(extract_json(response))
         except json.JSONDecodeError:
             # If parsing fails, skip memory update for this turn
             pass
 
+    def _merge_memory(self, updated_memory: Dict[str, Any]):
+        """Merge entities extracted by the memory-update prompt into self.memory."""
+        if merge_memory(self.memory, self._memory_seen, updated_memory):
+            self._memory_version += 1
+
+    def _reflect_and_update_memory(
+        self,
+        user_query: str,
+        orchestration_plan: Dict[str, Any],
+        agent_responses: Dict[str, Any],
+        proposed_response: str
+    ) -> Dict[str, Any]:
+        """
+        Steps 3 and 4 in a single Gemini call: review the response and update memory.
+
+        Memory is extracted from the proposed response, i.e. before any improvement
+        the reflection asks for.
+
+        Args:
+            user_query: Original user query
+            orchestration_plan: The orchestration plan used
+            agent_responses: Responses from agents
+            proposed_response: The synthesized response to review
+
+        Returns:
+            Dictionary with approval status and feedback, as from reflect_on_response
+        """
+        user_prompt = render_prompt(
+            ORCHESTRATOR_REFLECT_AND_MEMORY_PROMPT,
+            user_query=user_query,
+            orchestration_plan=dumps_pretty(orchestration_plan),
+            agent_responses=dumps_pretty(agent_responses),
+            proposed_response=proposed_response,
+            current_memory=self._memory_json
+        )
+
+        try:
+            response = call_gemini(
+                system_prompt=self.system_prompt,
+                cached_content=self._cached_content,
+                system_prompt_hash=self._system_prompt_hash,
+                user_prompt=user_prompt,
+                temperature=0.25
+            )
+            combined = extract_json(response)
+        except (json.JSONDecodeError, GeminiAPIError):
+            # Default to approved and keep the existing memory if the call or parsing fails
+            combined = {}
+        if not isinstance(combined, dict):
+            combined = {}
+
+        self._merge_memory(combined.get('memory_update') or {})
+        reflection = combined.get('reflection')
+        return reflection if isinstance(reflection, dict) else _approved_reflection()
+
     def _synthesize_response(
         self,
         user_query: str,
@@ -353,27 +812,16 @@ class Orchestrator:
         main_agent = orchestration_plan.get('main_agent', 'HC')
 
         # The main agent's response forms the core
-        main_response = agent_responses.get(main_agent, '')
-
-        # If main response is a dict (like DS agent), extract relevant text
-        if isinstance(main_response, dict):
-            if 'error' in main_response:
-                main_response = f"I encountered an issue: {main_response['error']}"
-            elif main_agent == 'DS':
-                main_response = f"Based on my analysis:\n\n{main_response.get('analysis_plan', '')}"
-
-        # For Health Coach as main agent, we typically return their response directly
-        # as they synthesize other agents' inputs
-        if main_agent == 'HC':
-            return str(main_response)
-
-        # For DS or DE as main agent, add HC perspective if available
-        if 'HC' in agent_responses and main_agent != 'HC':
-            hc_response = agent_responses['HC']
+        main_response = _response_text(main_agent, agent_responses.get(main_agent, ''))
+
+        # For DS or DE as main agent, add HC perspective if available. With HC as main
+        # agent its response is returned directly, as it synthesizes the others' inputs
+        if main_agent != 'HC':
+            hc_response = agent_responses.get('HC')
             if hc_response and not isinstance(hc_response, dict):
                 return f"{main_response}\n\n{hc_response}"
 
-        return str(main_response)
+        return main_response
 
     def _improve_response(
         self,
@@ -401,58 +849,26 @@ Suggested Improvements:
 Please provide an improved version that addresses these concerns while maintaining
 the helpful and personalized nature of the response."""
 
-        improved = call_gemini(
-            system_prompt="You are a health communication expert improving responses for clarity and completeness.",
-            user_prompt=prompt,
-            temperature=0.5
-        )
-
-        return improved
+        try:
+            return call_gemini(
+                system_prompt="You are a health communication expert improving responses for clarity and completeness.",
+                user_prompt=prompt,
+                temperature=0.5,
+                # A rewrite is only requested for a rejected draft; don't replay an old one
+                use_cache=False
+            )
+        except GeminiAPIError:
+            # The unrevised response is still better than none
+            return original_response
 
     def _format_conversation_history(self, max_turns: int = 5) -> str:
         """Format recent conversation history for prompts."""
-        if not self.conversation_history:
+        if not self._history_lines:
             return "No previous conversation"
 
-        recent = self.conversation_history[-max_turns * 2:]  # Last N turns (user + assistant pairs)
-        formatted = []
-
-        for turn in recent:
-            role = turn['role'].capitalize()
-            content = turn['content']
-            formatted.append(f"{role}: {content}")
-
-        return "\n\n".join(formatted)
-
-    def _extract_json(self, text: str) -> Dict[str, Any]:
-        """
-        Extract JSON from text that may contain markdown code blocks or other text.
-
-        Args:
-            text: Text potentially containing JSON
-
-        Returns:
-            Parsed JSON dictionary
-        """
-        # Try to find JSON in code blocks first
-        if '```json' in text:
-            start = text.find('```json') + 7
-            end = text.find('```', start)
-            json_text = text[start:end].strip()
-        elif '```' in text:
-            start = text.find('```') + 3
-            end = text.find('```', start)
-            json_text = text[start:end].strip()
-        else:
-            # Try to find JSON object boundaries
-            start = text.find('{')
-            end = text.rfind('}') + 1
-            if start != -1 and end > start:
-                json_text = text[start:end]
-            else:
-                json_text = text
-
-        return json.loads(json_text)
+        # Last N turns (user + assistant pairs)
+        start = max(0, len(self._history_lines) - max_turns * 2)
+        return "\n\n".join(itertools.islice(self._history_lines, start, None))
 
     def get_conversation_summary(self) -> Dict[str, Any]:
         """
@@ -461,8 +877,32 @@ the helpful and personalized nature of the response."""
         Returns:
             Dictionary with conversation stats and memory
         """
+        self.flush_memory()
         return {
-            'total_turns': len(self.conversation_history) // 2,
+            'total_turns': self._turn_count,
+            'plans_reused': self._plans_reused,
             'memory': self.memory,
-            'recent_conversation': self.conversation_history[-6:] if self.conversation_history else []
+            'recent_conversation': list(self.conversation_history)[-6:]
         }
+
+
+def build_initial_context(user_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the orchestrator's starting memory from a user's data.
+
+    Args:
+        user_data: Complete user data including health_context
+
+    Returns:
+        Memory dictionary seeded with the user's condition and medication names
+    """
+    health_records = user_data['health_context']['health_records']
+    return {
+        'goals': [],
+        'conditions': [c['name'] for c in health_records['conditions']],
+        'medications': [m['name'] for m in health_records['medications']],
+        'lifestyle': {},
+        'key_metrics': [],
+        'action_items': [],
+        'progress_notes': []
+    }
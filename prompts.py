@@ -5,13 +5,28 @@ Based on the research paper "The Anatomy of a Personal Health Agent" (arXiv 2508
 These prompts are adapted from the paper's appendices to work with Google Gemini API.
 """
 
-from jinja2 import Template
+from typing import Any, Dict
+
+from jinja2 import Template, meta
+
+# Variables each prompt template substitutes, recorded from its source when compiled
+_TEMPLATE_VARIABLES: Dict[Template, frozenset] = {}
+
+
+def _template(source: str) -> Template:
+    """Compile a prompt template, recording the variables its source refers to."""
+    template = Template(source)
+    _TEMPLATE_VARIABLES[template] = frozenset(
+        meta.find_undeclared_variables(template.environment.parse(source))
+    )
+    return template
+
 
 # ============================================================================
 # DOMAIN EXPERT AGENT PROMPTS (Adapted from paper)
 # ============================================================================
 
-DE_AGENT_PROMPT = Template("""You are tasked with acting as an authoritative domain expert in internal medicine and health that can reason about and interpret health related data across different data sources and modalities. You are also tasked with **contextualizing** user's data, putting health data into perspective and providing a comprehensive and personalized answers to the user's questions.
+DE_AGENT_PROMPT = _template("""You are tasked with acting as an authoritative domain expert in internal medicine and health that can reason about and interpret health related data across different data sources and modalities. You are also tasked with **contextualizing** user's data, putting health data into perspective and providing a comprehensive and personalized answers to the user's questions.
 
 You are also an excellent researcher who can provide authoritative answers based on established medical knowledge and evidence-based medicine.
 
@@ -53,7 +68,7 @@ Discuss any personalized recommendations that would be feasible and doable for t
 # DATA SCIENCE AGENT PROMPTS (Adapted from paper)
 # ============================================================================
 
-DS_AGENT_PROMPT = Template("""You are an expert Python data analyst skilled in working with time series health data. Your task is to analyze health and fitness data to answer user queries.
+DS_AGENT_PROMPT = _template("""You are an expert Python data analyst skilled in working with time series health data. Your task is to analyze health and fitness data to answer user queries.
 
 **Available Data:**
 {{ data_summary }}
@@ -99,7 +114,7 @@ You are one of three agents in a multi-agent system:
 {{ personal_data }}
 """)
 
-DS_CODE_GENERATION_PROMPT = Template("""You are an expert Python data scientist. Generate Python code to perform the analysis described below.
+DS_CODE_GENERATION_PROMPT = _template("""You are an expert Python data scientist. Generate Python code to perform the analysis described below.
 
 **Available Data Summary:**
 {{ data_summary }}
@@ -145,7 +160,7 @@ Generate the complete function implementation.
 # HEALTH COACH AGENT PROMPTS (Adapted from paper)
 # ============================================================================
 
-HC_AGENT_PROMPT = Template("""You are a helpful conversational health assistant. You will continue the Coach role in a conversation with a User.
+HC_AGENT_PROMPT = _template("""You are a helpful conversational health assistant. You will continue the Coach role in a conversation with a User.
 
 **Communication Style:**
 - Keep your responses short, USE A CASUAL CONVERSATIONAL TONE but be motivational sometimes
@@ -193,7 +208,7 @@ You are one of three agents in a multi-agent system:
 {{ conversation_history }}
 """)
 
-HC_RECOMMENDATION_PROMPT = Template("""Based on the conversation, determine if it's time to make a recommendation.
+HC_RECOMMENDATION_PROMPT = _template("""Based on the conversation, determine if it's time to make a recommendation.
 
 **Conversation Summary:**
 {{ conversation_summary }}
@@ -226,7 +241,7 @@ The Coach should make a recommendation when they know:
 # ORCHESTRATOR PROMPTS (Adapted from paper)
 # ============================================================================
 
-ORCHESTRATOR_SYSTEM_PROMPT = Template("""You are an expert in personal health assistance and a helpful conversational orchestrator.
+ORCHESTRATOR_SYSTEM_PROMPT = _template("""You are an expert in personal health assistance and a helpful conversational orchestrator.
 
 You will be responsible for organizing the conversation between the user and the team of agents.
 
@@ -237,15 +252,17 @@ You will have the following expert agents to leverage:
 - **Domain Expert Agent**: This agent will act as an expert in health and medical domains. It is responsible for providing domain-specific information about the user's question, if the question needs domain knowledge.
 - **Health Coach Agent**: This agent will act as an expert in health coach. It is responsible for guiding the user and helping them set and achieve their goal, if the question needs health coach advice.
 
-{{ context }}
+When you need several independent pieces of information, call all the relevant agents in a single plan so they run in parallel.
 """)
 
-ORCHESTRATOR_TASK_ASSIGNMENT_PROMPT = Template("""Given the user's current question and conversation history, determine which agents should be involved.
+ORCHESTRATOR_TASK_ASSIGNMENT_PROMPT = _template("""Given the user's current question and conversation history, determine which agents should be involved.
 
 **User Query:** {{ user_query }}
 
 **Conversation History:** {{ conversation_history }}
 
+**Current Memory:** {{ current_memory }}
+
 **Task:**
 Identify the main agent and any supporting agents needed.
 
@@ -263,22 +280,28 @@ Identify the main agent and any supporting agents needed.
 - For general health questions without data needs, Domain Expert is main agent
 - For "how do I..." or goal-oriented questions, Health Coach is main agent
 
+**Invocations:**
+- List one invocation for every agent that should work on this query, all in this one response
+- The invocations are dispatched together and independent ones run in parallel; the Health Coach Agent receives the others' results
+- Agents without an invocation are not called
+- Set "depends_on" to the agents whose results an invocation builds on. Use [] for a Domain Expert task that needs no analysis of the user's data, so it starts without waiting for the Data Science Agent
+
 **Output Format (JSON):**
 {
     "user_intent": "Brief description of what user is asking",
     "main_agent": "DS|DE|HC",
     "supporting_agents": ["DS", "DE", "HC"],
-    "tasks": {
-        "DS": "Specific task for DS agent",
-        "DE": "Specific task for DE agent",
-        "HC": "Specific task for HC agent"
-    }
+    "invocations": [
+        {"agent": "DS", "task": "Specific task for DS agent"},
+        {"agent": "DE", "task": "Specific task for DE agent", "depends_on": ["DS"]},
+        {"agent": "HC", "task": "Specific task for HC agent"}
+    ]
 }
 
 Provide only the JSON output, no additional text.
 """)
 
-ORCHESTRATOR_REFLECTION_PROMPT = Template("""Review the response before presenting it to the user.
+ORCHESTRATOR_REFLECTION_PROMPT = _template("""Review the response before presenting it to the user.
 
 **User Query:** {{ user_query }}
 
@@ -290,6 +313,8 @@ ORCHESTRATOR_REFLECTION_PROMPT = Template("""Review the response before presenti
 **Proposed Final Response:**
 {{ proposed_response }}
 
+**Current Memory:** {{ current_memory }}
+
 **Evaluation Criteria:**
 1. **COMPLETENESS**: Does it fully address the user's query?
 2. **COHERENCE**: Do insights from different agents align and complement each other?
@@ -310,7 +335,7 @@ Determine if the response is ready to present to the user, or if it needs improv
 Provide only the JSON output.
 """)
 
-ORCHESTRATOR_MEMORY_UPDATE_PROMPT = Template("""Extract and log key entities from this conversation turn to maintain context.
+ORCHESTRATOR_MEMORY_UPDATE_PROMPT = _template("""Extract and log key entities from this conversation turn to maintain context.
 
 **User Query:** {{ user_query }}
 
@@ -341,6 +366,61 @@ ORCHESTRATOR_MEMORY_UPDATE_PROMPT = Template("""Extract and log key entities fro
 Only include new information not already in current memory. Provide only the JSON output.
 """)
 
+ORCHESTRATOR_REFLECT_AND_MEMORY_PROMPT = _template("""Review the response before presenting it to the user, and extract key entities from this conversation turn to maintain context.
+
+**User Query:** {{ user_query }}
+
+**Orchestration Plan:** {{ orchestration_plan }}
+
+**Agent Responses:**
+{{ agent_responses }}
+
+**Proposed Final Response:**
+{{ proposed_response }}
+
+**Current Memory:** {{ current_memory }}
+
+**Part 1 - Evaluation Criteria:**
+1. **COMPLETENESS**: Does it fully address the user's query?
+2. **COHERENCE**: Do insights from different agents align and complement each other?
+3. **ACCURACY**: Are there any contradictions or questionable claims?
+4. **ACTIONABILITY**: Are recommendations clear and feasible?
+5. **SAFETY**: Are there any health concerns that need professional attention flagged?
+
+Determine if the response is ready to present to the user, or if it needs improvement.
+
+**Part 2 - Extract and Update:**
+1. Health goals mentioned
+2. Medical conditions or symptoms discussed
+3. Lifestyle factors (exercise, diet, sleep patterns, etc.)
+4. Medications or treatments mentioned
+5. Specific metrics or data points of interest
+6. Action items or commitments made
+7. Progress updates on previous goals
+
+Only include new information not already in current memory.
+
+**Output Format (JSON):**
+{
+    "reflection": {
+        "approved": true/false,
+        "issues": ["list of any problems found"],
+        "suggested_improvements": "How to fix the issues if not approved"
+    },
+    "memory_update": {
+        "goals": ["list of goals"],
+        "conditions": ["list of conditions"],
+        "lifestyle": {"key": "value"},
+        "medications": ["list of medications"],
+        "key_metrics": ["list of metrics"],
+        "action_items": ["list of action items"],
+        "progress_notes": ["list of notes"]
+    }
+}
+
+Provide only the JSON output.
+""")
+
 # ============================================================================
 # UTILITY FUNCTIONS
 # ============================================================================
@@ -356,13 +436,23 @@ def render_prompt(template: Template, **kwargs) -> str:
     Returns:
         Rendered prompt string
     """
-    return template.render(**kwargs)
+    split = _PRESPLIT.get(template)
+    if split is None:
+        return template.render(**kwargs)
+
+    static, names = split
+    parts = [static[0]]
+    for name, text in zip(names, static[1:]):
+        value = kwargs.get(name, "")
+        parts.append(value if isinstance(value, str) else str(value))
+        parts.append(text)
+    return "".join(parts)
 
 # ============================================================================
 # UNIFIED AGENT PROMPTS (Single-agent baseline for comparison)
 # ============================================================================
 
-UNIFIED_AGENT_PROMPT = Template("""You are a comprehensive Personal Health Agent with expertise across three critical domains:
+UNIFIED_AGENT_PROMPT = _template("""You are a comprehensive Personal Health Agent with expertise across three critical domains:
 
 **1. DATA ANALYSIS & STATISTICS**
 You are an expert Python data analyst skilled in working with time-series health data. You can:
@@ -404,13 +494,6 @@ Your coaching style should be:
 **AVAILABLE DATA:**
 {{ user_data }}
 
-**CONVERSATION MEMORY:**
-Goals: {{ memory.goals }}
-Conditions: {{ memory.conditions }}
-Medications: {{ memory.medications }}
-Action Items: {{ memory.action_items }}
-Key Metrics: {{ memory.key_metrics }}
-
 **YOUR TASK:**
 Respond directly to user queries by integrating all three domains as needed:
 1. If the query involves personal data → Analyze the relevant metrics
@@ -424,16 +507,41 @@ Respond directly to user queries by integrating all three domains as needed:
 - For medical questions, cite clinical ranges and evidence
 - For goal-setting, use open-ended questions to explore motivations
 - Synthesize insights from all domains into cohesive responses
-- Maintain conversation context using the memory provided
+- Maintain conversation context using the conversation memory provided with each query
 """)
 
-UNIFIED_MEMORY_UPDATE_PROMPT = Template("""Extract and log key entities from this conversation turn to maintain context for future queries.
+# The unified agent's per-turn prompts only substitute values, so they are plain
+# string joins rather than Jinja templates: static skeletons split around their
+# insertion points, as for the agents' inline prompts
+def render_unified_memory_block(memory: Dict[str, Any]) -> str:
+    """
+    Render the conversation memory the unified agent sends with each query.
 
-**User Query:** {{ user_query }}
+    It goes in the user prompt rather than the system prompt, so the system prompt
+    stays identical across turns.
 
-**Your Response:** {{ agent_response }}
+    Args:
+        memory: The unified agent's memory
 
-**Current Memory:** {{ current_memory }}
+    Returns:
+        Memory block for the top of the user prompt
+    """
+    return (
+        f"**CONVERSATION MEMORY:**\n"
+        f"Goals: {memory['goals']}\n"
+        f"Conditions: {memory['conditions']}\n"
+        f"Medications: {memory['medications']}\n"
+        f"Action Items: {memory['action_items']}\n"
+        f"Key Metrics: {memory['key_metrics']}"
+    )
+
+
+_UNIFIED_MEMORY_UPDATE_TMPL = (
+    "Extract and log key entities from this conversation turn to maintain context for future queries."
+    "\n\n**User Query:** ",
+    "\n\n**Your Response:** ",
+    "\n\n**Current Memory:** ",
+    """
 
 **Extract and Update:**
 1. **Health goals** mentioned by user (e.g., "lose weight", "improve sleep")
@@ -459,8 +567,57 @@ UNIFIED_MEMORY_UPDATE_PROMPT = Template("""Extract and log key entities from thi
 - Only include NEW information not already in current memory
 - Return empty lists/dicts if no new entities to extract
 - Be conservative - only extract explicitly mentioned information
-- Provide only the JSON output, no additional text.
-""")
+- Provide only the JSON output, no additional text.""",
+)
+
+
+def render_unified_memory_update(user_query: str, agent_response: str, current_memory: str) -> str:
+    """
+    Render the unified agent's memory-extraction prompt for one conversation turn.
+
+    Args:
+        user_query: The user's query
+        agent_response: The agent's response
+        current_memory: The current memory, serialized as JSON
+
+    Returns:
+        Rendered prompt string
+    """
+    return "".join((
+        _UNIFIED_MEMORY_UPDATE_TMPL[0], user_query,
+        _UNIFIED_MEMORY_UPDATE_TMPL[1], agent_response,
+        _UNIFIED_MEMORY_UPDATE_TMPL[2], current_memory,
+        _UNIFIED_MEMORY_UPDATE_TMPL[3]
+    ))
+
+# Every template only substitutes values, so each is rendered once at import with
+# sentinels in its placeholders and split into its static text. render_prompt then
+# joins the caller's values between those pieces instead of running Jinja on every
+# call, and the static text stays byte-identical from one call to the next.
+_SENTINEL = "\x00"
+
+
+def _presplit(template: Template):
+    names = _TEMPLATE_VARIABLES[template]
+    rendered = template.render(**{name: f"{_SENTINEL}{name}{_SENTINEL}" for name in names})
+    pieces = rendered.split(_SENTINEL)
+    if set(pieces[1::2]) != names:
+        raise ValueError(f"Template does more than substitute {sorted(names)}")
+    return tuple(pieces[0::2]), tuple(pieces[1::2])
+
+
+_PRESPLIT = {template: _presplit(template) for template in _TEMPLATE_VARIABLES}
+
+# System prompt templates by agent type. Each is compiled once when this module is
+# imported, so building an agent only pays for rendering its context.
+AGENT_PROMPTS = {
+    'DS': DS_AGENT_PROMPT,
+    'DE': DE_AGENT_PROMPT,
+    'HC': HC_AGENT_PROMPT,
+    'ORCHESTRATOR': ORCHESTRATOR_SYSTEM_PROMPT,
+    'UNIFIED': UNIFIED_AGENT_PROMPT
+}
+
 
 def get_agent_prompt(agent_type: str, **context) -> str:
     """
@@ -473,15 +630,7 @@ def get_agent_prompt(agent_type: str, **context) -> str:
     Returns:
         Rendered system prompt
     """
-    prompts = {
-        'DS': DS_AGENT_PROMPT,
-        'DE': DE_AGENT_PROMPT,
-        'HC': HC_AGENT_PROMPT,
-        'ORCHESTRATOR': ORCHESTRATOR_SYSTEM_PROMPT,
-        'UNIFIED': UNIFIED_AGENT_PROMPT
-    }
-
-    template = prompts.get(agent_type)
+    template = AGENT_PROMPTS.get(agent_type)
     if template:
-        return template.render(**context)
+        return render_prompt(template, **context)
     return ""
@@ -0,0 +1,34 @@
+"""
+Tests for the specialist agents' prompt state, without API calls.
+"""
+
+from agents import DataScienceAgent, DomainExpertAgent, HealthCoachAgent
+from mock_data import get_mock_user_data
+
+
+def test_new_context_renders_a_new_system_prompt():
+    """Replacing an agent's context replaces its system prompt and cache key with it."""
+    user_data = get_mock_user_data()
+    de_agent = DomainExpertAgent(user_health_context=user_data['health_context'])
+    hc_agent = HealthCoachAgent(user_context=user_data['user_profile'])
+
+    for agent, name, value, text in (
+        (de_agent, 'user_health_context', {'health_profile': {'age': 101}}, "101"),
+        (hc_agent, 'user_context', {'name': "Zelda Quinn"}, "Zelda Quinn"),
+    ):
+        prompt, digest = agent.system_prompt, agent._system_prompt_hash
+        setattr(agent, name, value)
+        assert agent.system_prompt != prompt
+        assert agent._system_prompt_hash != digest
+        assert text in agent.system_prompt
+
+
+def test_refreshed_personal_data_renders_a_new_system_prompt():
+    ds_agent = DataScienceAgent(personal_data=get_mock_user_data()['personal_data'])
+    prompt = ds_agent.system_prompt
+
+    ds_agent.personal_data['note'] = "added later"
+    ds_agent.refresh_data_summary()
+
+    assert ds_agent.system_prompt != prompt
+    assert "added later" in ds_agent.system_prompt
@@ -0,0 +1,264 @@
+"""
+Tests for the Gemini client's caching, coalescing and retry layers, without API calls.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import api_client
+from api_client import GeminiAPIError, GeminiRetryError
+
+
+class StaleContext(Exception):
+    """Stands in for the API error Gemini raises for expired cached content."""
+
+
+class Transient(Exception):
+    """Stands in for a retryable API error (rate limit, outage, timeout)."""
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Answers each prompt through `handler`, counting calls."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.calls = []
+
+    def generate_content(self, prompt, stream=False):
+        self.calls.append(prompt)
+        return FakeResponse(self.handler(prompt))
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    """api_client with fresh caches, no backoff, and requests served by a FakeModel."""
+    monkeypatch.delenv("PHA_CACHE_DISABLE", raising=False)
+    monkeypatch.setattr(api_client, "_ensure_configured", lambda: None)
+    monkeypatch.setattr(api_client, "_retryable_errors", (Transient,))
+    monkeypatch.setattr(api_client, "_stale_context_errors", (StaleContext,))
+    monkeypatch.setattr(api_client, "_backoff_delay", lambda attempt: 0)
+    monkeypatch.setattr(api_client, "_RESPONSE_CACHE", api_client._TTLCache(maxsize=16, ttl=600))
+    monkeypatch.setattr(
+        api_client, "_DISK_CACHE", api_client._DiskCache(str(tmp_path), ttl=3600, size_limit=1 << 20)
+    )
+    monkeypatch.setattr(api_client, "_CONTEXT_CACHE", {})
+    monkeypatch.setattr(api_client, "_CONTEXT_INFLIGHT", {})
+
+    model = FakeModel(lambda prompt: "answer")
+    contexts = []
+
+    def prepare(system_prompt, user_prompt, model_name, temperature, max_tokens, cached_content):
+        contexts.append(cached_content)
+        return model, user_prompt
+
+    monkeypatch.setattr(api_client, "_prepare_request", prepare)
+    model.contexts = contexts
+    return model
+
+
+def test_stale_cached_content_falls_back_to_inline_prompt(client):
+    """An expired context-cache handle is dropped and the request resent inline once."""
+    handle = object()
+    api_client._CONTEXT_CACHE[("m", b"h")] = (float("inf"), handle)
+
+    def handler(prompt):
+        if client.contexts[-1] is handle:
+            raise StaleContext("CachedContent not found")
+        return "inline answer"
+
+    client.handler = handler
+    text = api_client.call_gemini("system", "user", cached_content=handle, use_cache=False)
+
+    assert text == "inline answer"
+    assert client.contexts == [handle, None]
+    assert api_client._CONTEXT_CACHE == {}
+
+
+def test_other_errors_with_cached_content_are_not_retried_inline(client):
+    """Only a stale-handle error triggers the inline retry."""
+    def handler(prompt):
+        raise ValueError("bad request")
+
+    client.handler = handler
+    with pytest.raises(GeminiAPIError):
+        api_client.call_gemini("system", "user", cached_content=object(), use_cache=False)
+    assert len(client.calls) == 1
+
+
+def test_identical_calls_are_served_from_the_cache(client):
+    assert api_client.call_gemini("system", "user") == "answer"
+    assert api_client.call_gemini("system", "user") == "answer"
+    assert len(client.calls) == 1
+
+    api_client.call_gemini("system", "another question")
+    api_client.call_gemini("system", "user", temperature=0.9)
+    assert len(client.calls) == 3
+
+
+def test_disk_cache_survives_a_cleared_memory_cache(client):
+    api_client.call_gemini("system", "user")
+    api_client._RESPONSE_CACHE.clear()
+
+    assert api_client.call_gemini("system", "user") == "answer"
+    assert len(client.calls) == 1
+
+
+def test_expired_entries_are_requested_again(client, monkeypatch):
+    """Entries expire after the memory cache's TTL (the disk layer's is set to zero)."""
+    now = [1000.0]
+    monkeypatch.setattr(api_client.time, "monotonic", lambda: now[0])
+    api_client._DISK_CACHE.ttl = 0  # Only the memory layer's expiry is under test
+
+    api_client.call_gemini("system", "user")
+    now[0] += api_client._RESPONSE_CACHE.ttl - 1
+    api_client.call_gemini("system", "user")
+    assert len(client.calls) == 1
+
+    now[0] += 2
+    api_client.call_gemini("system", "user")
+    assert len(client.calls) == 2
+
+
+def test_use_cache_false_always_calls_the_api(client):
+    api_client.call_gemini("system", "user", use_cache=False)
+    api_client.call_gemini("system", "user", use_cache=False)
+    api_client.call_gemini("system", "user")
+    assert len(client.calls) == 3
+
+
+def test_concurrent_identical_calls_hit_the_api_once(client):
+    release = threading.Event()
+
+    def handler(prompt):
+        release.wait(timeout=5)
+        return "shared answer"
+
+    client.handler = handler
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(api_client.call_gemini, "system", "user") for _ in range(8)]
+        while not client.calls:
+            time.sleep(0.001)
+        time.sleep(0.05)  # Let the other callers queue up behind the first
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert results == ["shared answer"] * 8
+    assert len(client.calls) == 1
+    assert api_client._INFLIGHT == {}
+
+
+def test_caller_arriving_after_the_leader_finished_uses_its_result(client, monkeypatch):
+    """A response cached between a caller's cache miss and its in-flight check is reused."""
+    key = api_client._cache_key("system", "user", api_client.DEFAULT_MODEL, 0.5, 8192)
+    api_client._RESPONSE_CACHE[key] = "leader's answer"
+    monkeypatch.setattr(api_client, "_cache_get", lambda key: None)  # The earlier miss
+
+    assert api_client.call_gemini("system", "user") == "leader's answer"
+    assert client.calls == []
+
+
+def test_transient_errors_are_retried(client):
+    failures = [Transient("429"), Transient("503")]
+
+    def handler(prompt):
+        if failures:
+            raise failures.pop(0)
+        return "finally"
+
+    client.handler = handler
+    assert api_client.call_gemini("system", "user") == "finally"
+    assert len(client.calls) == 3
+
+
+def test_persistent_transient_errors_give_up(client):
+    def handler(prompt):
+        raise Transient("429")
+
+    client.handler = handler
+    with pytest.raises(GeminiRetryError):
+        api_client.call_gemini("system", "user")
+    assert len(client.calls) == api_client.MAX_ATTEMPTS
+
+
+def test_other_errors_are_not_retried_or_cached(client):
+    def handler(prompt):
+        raise ValueError("bad request")
+
+    client.handler = handler
+    with pytest.raises(GeminiAPIError):
+        api_client.call_gemini("system", "user")
+    assert len(client.calls) == 1
+
+    client.handler = lambda prompt: "recovered"
+    assert api_client.call_gemini("system", "user") == "recovered"
+
+
+def test_disk_cache_files_are_private(tmp_path):
+    directory = tmp_path / "pha"
+    directory.mkdir(mode=0o755)
+    directory.chmod(0o755)
+    cache = api_client._DiskCache(str(directory), ttl=3600, size_limit=1 << 20)
+
+    cache[b"key"] = "health data"
+    assert cache.get(b"key") == "health data"
+    assert directory.stat().st_mode & 0o777 == 0o700
+    for path in directory.iterdir():
+        assert path.stat().st_mode & 0o777 == 0o600, path.name
+
+
+def test_cache_directory_owned_by_another_user_is_refused(tmp_path, monkeypatch):
+    monkeypatch.setattr(api_client.os, "getuid", lambda: tmp_path.stat().st_uid + 1)
+    with pytest.raises(PermissionError):
+        api_client.ensure_private_dir(str(tmp_path))
+
+    cache = api_client._DiskCache(str(tmp_path), ttl=3600, size_limit=1 << 20)
+    cache[b"key"] = "health data"
+    assert cache.get(b"key") is None
+    assert not (tmp_path / "responses.sqlite3").exists()
+
+
+class FakeCaching:
+    """Stands in for genai.caching: CachedContent.create blocks until its prompt is released."""
+
+    def __init__(self):
+        self.created = []
+        self.released = {}
+        self.CachedContent = self
+
+    def create(self, model, system_instruction, ttl):
+        self.created.append(system_instruction)
+        self.released.setdefault(system_instruction, threading.Event()).wait(timeout=5)
+        return f"handle for {system_instruction}"
+
+
+def test_context_registration_is_single_flight_per_prompt(client, monkeypatch):
+    """Callers for one prompt share its registration; other prompts don't wait for it."""
+    caching = FakeCaching()
+    monkeypatch.setattr(api_client, "genai", type("FakeGenai", (), {"caching": caching}))
+    caching.released["slow prompt"] = threading.Event()
+    caching.released["fast prompt"] = threading.Event()
+    caching.released["fast prompt"].set()
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        slow = [pool.submit(api_client.create_cached_context, "slow prompt") for _ in range(4)]
+        while not caching.created:
+            time.sleep(0.001)
+        # Registered while the slow prompt's registration is still in progress
+        fast = pool.submit(api_client.create_cached_context, "fast prompt")
+        assert fast.result(timeout=1) == "handle for fast prompt"
+
+        caching.released["slow prompt"].set()
+        assert [future.result() for future in slow] == ["handle for slow prompt"] * 4
+
+    assert sorted(caching.created) == ["fast prompt", "slow prompt"]
+    assert api_client._CONTEXT_INFLIGHT == {}
+    assert api_client.create_cached_context("slow prompt") == "handle for slow prompt"
+    assert len(caching.created) == 2
@@ -0,0 +1,82 @@
+"""
+Tests for the comparison cache, without API calls.
+"""
+
+import asyncio
+import time
+
+import comparison
+from comparison import AgentComparison
+from mock_data import get_mock_user_data
+
+
+class FakeSystem:
+    """Answers every query after `delay` seconds, counting calls."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+
+    async def aprocess_query(self, query):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {'response': f"answer to {query}", 'orchestration_plan': {'main_agent': 'HC'}}
+
+
+def _comparison(monkeypatch, use_cache):
+    instance = AgentComparison(get_mock_user_data(), use_cache=use_cache)
+    multi, single = FakeSystem(0.02), FakeSystem(0.01)
+    monkeypatch.setattr(instance, '_acquire_systems', lambda: (multi, single))
+    return instance, multi
+
+
+def test_cache_is_off_by_default(monkeypatch):
+    instance, multi = _comparison(monkeypatch, use_cache=False)
+    assert AgentComparison.__init__.__defaults__[0] is False
+
+    report = instance.run_batch_comparison(["How is my sleep?"] * 2, save_results=False)
+    assert multi.calls == 2
+    assert report['cached_queries'] == 0
+
+
+def test_replayed_results_are_labelled_and_not_timed(monkeypatch, capsys):
+    instance, multi = _comparison(monkeypatch, use_cache=True)
+    monkeypatch.setattr('builtins.input', lambda prompt: '')
+
+    report = instance.run_batch_comparison(
+        ["How is my sleep?", "how is my  SLEEP?", "How is my sleep?"],
+        save_results=False, show_metrics=True, pause_between=True
+    )
+
+    assert multi.calls == 1
+    assert report['cached_queries'] == 2
+    assert report['success_rate']['multi_agent'] == 1.0
+    # The average covers only the one real run
+    first_run_time = instance.results['multi_agent'][0]['time']
+    assert report['avg_response_time']['multi_agent'] == first_run_time
+    assert [r['cached'] for r in instance.results['multi_agent']] == [False, True, True]
+    assert capsys.readouterr().out.count("[cached]") == 2
+
+
+def test_cache_flag():
+    assert not comparison._parse_args([]).cache
+    assert comparison._parse_args(['--cache', '--semantic-cache']).semantic_cache
+
+
+class BlockingSystem:
+    """Answers every query from a blocking call on a worker thread, like the real systems."""
+
+    async def aprocess_query(self, query):
+        await asyncio.to_thread(time.sleep, 0.1)
+        return {'response': "answer", 'orchestration_plan': {}}
+
+
+def test_batch_timings_do_not_include_waiting_for_a_thread(monkeypatch):
+    """Concurrent queries each get a thread, so every one takes about as long as its call."""
+    instance = AgentComparison(get_mock_user_data())
+    monkeypatch.setattr(instance, '_acquire_systems', lambda: (BlockingSystem(), BlockingSystem()))
+
+    instance.run_batch_comparison(["How is my sleep?"] * 8, save_results=False, concurrency=8)
+
+    times = [result['time'] for result in instance.results['multi_agent'] + instance.results['single_agent']]
+    assert max(times) < 0.18
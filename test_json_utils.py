@@ -0,0 +1,51 @@
+"""
+Tests for JSON extraction from model responses.
+"""
+
+import json
+
+import pytest
+
+from json_utils import extract_json
+
+
+def test_prefers_json_fence_over_earlier_code_fence():
+    text = (
+        "Here is the analysis:\n```python\nresult = {'mean': 7.2}\n```\n"
+        "And the output:\n```json\n{\"approved\": true}\n```"
+    )
+    assert extract_json(text) == {'approved': True}
+
+
+def test_falls_back_to_untagged_fence():
+    text = "```python\nprint('hi')\n```\n```\n{\"goals\": [\"Walk more\"]}\n```"
+    assert extract_json(text) == {'goals': ["Walk more"]}
+
+
+def test_first_json_fence_wins():
+    text = "```json\n{\"a\": 1}\n```\nthen\n```json\n{\"a\": 2}\n```"
+    assert extract_json(text) == {'a': 1}
+
+
+def test_one_line_json_fence():
+    assert extract_json('```json{"a": 1}```') == {'a': 1}
+
+
+def test_object_in_prose_with_braces_inside_strings():
+    text = 'Sure! {"note": "use {curly} braces }", "n": 1} Hope that helps {not json}'
+    assert extract_json(text) == {'note': "use {curly} braces }", 'n': 1}
+
+
+def test_object_in_prose_with_escaped_quotes():
+    text = 'Result: {"quote": "she said \\"hi {there}\\"", "path": "C:\\\\"} done'
+    assert extract_json(text) == {'quote': 'she said "hi {there}"', 'path': "C:\\"}
+
+
+def test_nested_objects():
+    text = 'Plan: {"tasks": {"DS": "a", "DE": {"x": "}"}}} trailing'
+    assert extract_json(text) == {'tasks': {'DS': "a", 'DE': {'x': "}"}}}
+
+
+def test_no_json_raises():
+    with pytest.raises(json.JSONDecodeError):
+        extract_json("No structured output here.")
@@ -0,0 +1,57 @@
+"""
+Tests for the CLI's mock-data snapshot and canned replies.
+"""
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def snapshot_dir(monkeypatch, tmp_path):
+    """Point the user-data snapshot at a fresh cache directory."""
+    directory = tmp_path / "pha"
+    monkeypatch.delenv("PHA_CACHE_DISABLE", raising=False)
+    monkeypatch.setattr(main, "CACHE_DIR", str(directory))
+    monkeypatch.setattr(main, "_USER_DATA_SNAPSHOT", str(directory / "user_data.json"))
+    return directory
+
+
+def test_user_data_snapshot_is_private_and_reused(snapshot_dir):
+    user_data = main.load_user_data()
+
+    snapshot = snapshot_dir / "user_data.json"
+    assert snapshot_dir.stat().st_mode & 0o777 == 0o700
+    assert snapshot.stat().st_mode & 0o777 == 0o600
+    assert main.load_user_data() == user_data
+
+
+def test_snapshot_in_another_users_directory_is_ignored(snapshot_dir, monkeypatch):
+    snapshot_dir.mkdir()
+    (snapshot_dir / "user_data.json").write_text('{"planted": true}')
+    monkeypatch.setattr(main.os, "getuid", lambda: snapshot_dir.stat().st_uid + 1)
+
+    assert "planted" not in main.load_user_data()
+
+
+def test_canned_replies_cover_only_the_allowlist():
+    assert main._canned_reply("Hi!") == main._TRIVIAL_RESPONSES['hi']
+    assert main._canned_reply("thank you.") == main._TRIVIAL_RESPONSES['thank you']
+    for short_query in ("no", "A1c", "why", "BP?"):
+        assert main._canned_reply(short_query) is None
+
+
+def test_answers_to_an_agent_question_go_to_the_agents():
+    question = "Would you like me to build a weekly sleep plan?\n"
+    assert main._canned_reply("ok", last_response=question) is None
+    assert main._canned_reply("thanks", last_response=question) is None
+    assert main._canned_reply("ok", last_response="Here is your plan.") == main._TRIVIAL_RESPONSES['ok']
+
+
+def test_combine_review_flag_reaches_the_orchestrator(monkeypatch):
+    monkeypatch.setenv("PHA_CACHE_DISABLE", "1")
+    args = main._parse_args(['interactive', '--combine-review'])
+    orchestrator, _ = main.initialize_system(combine_review_calls=args.combine_review)
+
+    assert orchestrator.combine_review_calls
+    assert not main._parse_args(['interactive']).combine_review
@@ -0,0 +1,59 @@
+"""
+Tests for the shared conversation-memory merge.
+"""
+
+from memory_utils import MEMORY_LIST_MAX, index_memory, memory_item_key, merge_memory
+
+
+def _empty_memory():
+    return {
+        'goals': [], 'conditions': [], 'lifestyle': {}, 'medications': [],
+        'key_metrics': [], 'action_items': [], 'progress_notes': []
+    }
+
+
+def test_dedup_ignores_case_and_spacing():
+    memory = _empty_memory()
+    seen = index_memory(memory)
+
+    assert merge_memory(memory, seen, {'goals': ["Improve sleep", "improve  Sleep", "IMPROVE SLEEP"]})
+    assert not merge_memory(memory, seen, {'goals': [" improve sleep "]})
+    assert memory['goals'] == ["Improve sleep"]
+
+
+def test_structured_entries_dedup_regardless_of_key_order():
+    assert memory_item_key({'a': 1, 'b': 2}) == memory_item_key({'b': 2, 'a': 1})
+    assert memory_item_key({'a': 1}) != memory_item_key({'a': 2})
+
+
+def test_lists_are_capped_oldest_first():
+    memory = _empty_memory()
+    seen = index_memory(memory)
+
+    merge_memory(memory, seen, {'action_items': [f"Item {i}" for i in range(MEMORY_LIST_MAX + 5)]})
+    assert len(memory['action_items']) == MEMORY_LIST_MAX
+    assert memory['action_items'][0] == "Item 5"
+    assert len(seen['action_items']) == MEMORY_LIST_MAX
+
+    # An evicted entry counts as new again
+    assert merge_memory(memory, seen, {'action_items': ["item 0"]})
+    assert memory['action_items'][-1] == "item 0"
+    assert memory['action_items'][0] == "Item 6"
+
+
+def test_malformed_updates_are_ignored():
+    memory = _empty_memory()
+    seen = index_memory(memory)
+
+    assert not merge_memory(memory, seen, ["not", "an", "object"])
+    assert not merge_memory(memory, seen, {'goals': "Sleep more", 'lifestyle': ["runs"]})
+    assert memory == _empty_memory()
+
+
+def test_merge_does_not_mutate_the_initial_lists():
+    initial = _empty_memory()
+    memory = dict(initial)
+    merge_memory(memory, index_memory(memory), {'goals': ["Walk daily"]})
+
+    assert memory['goals'] == ["Walk daily"]
+    assert initial['goals'] == []
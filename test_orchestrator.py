@@ -0,0 +1,249 @@
+"""
+Tests for the Orchestrator's memory handling and agent dispatch, without API calls.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import orchestrator
+from orchestrator import Orchestrator
+
+
+def test_failed_background_memory_update_is_not_reraised(monkeypatch):
+    """A memory update that fails on the executor leaves memory as it was."""
+    def fail(user_query, final_response):
+        raise TypeError("malformed memory update")
+
+    agent = Orchestrator(None, None, None, executor=ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(agent, "update_memory", fail)
+    before = agent.memory.copy()
+
+    agent._pending_memory_update = agent.executor.submit(
+        agent._update_memory_in_background, "query", "response"
+    )
+    agent.flush_memory()
+
+    assert agent.memory == before
+
+
+def test_merge_memory_ignores_malformed_updates():
+    """Non-object updates and a non-dict lifestyle leave memory unchanged."""
+    agent = Orchestrator(None, None, None)
+    version = agent._memory_version
+
+    agent._merge_memory(["not", "an", "object"])
+    agent._merge_memory({'lifestyle': ["runs daily"], 'goals': "sleep more"})
+
+    assert agent.memory['lifestyle'] == {}
+    assert agent.memory['goals'] == []
+    assert agent._memory_version == version
+
+    agent._merge_memory({'lifestyle': {'exercise': 'runs daily'}, 'goals': ["Sleep more"]})
+    assert agent.memory['lifestyle'] == {'exercise': 'runs daily'}
+    assert agent.memory['goals'] == ["Sleep more"]
+
+
+class FakeDS:
+    def generate_analysis_plan(self, user_query):
+        return "analysis plan"
+
+    def generate_analysis_code(self, analysis_plan, user_query):
+        return "analysis code"
+
+
+class FakeDE:
+    def __init__(self):
+        self.ds_analyses = []
+
+    def synthesize_insights(self, user_query, ds_analysis=None):
+        self.ds_analyses.append(ds_analysis)
+        return "insights"
+
+
+class FakeHC:
+    def reset_conversation(self):
+        pass
+
+
+def _dispatch(plan):
+    """Run a plan's DS and DE tasks, returning what DE was given as the DS analysis."""
+    de_agent = FakeDE()
+    agent = Orchestrator(FakeDS(), de_agent, None)
+    responses = asyncio.run(agent.aorchestrate_agents("How is my sleep?", plan))
+    assert responses['DE'] == "insights"
+    assert responses['DS']['analysis_code'] == "analysis code"
+    return de_agent.ds_analyses
+
+
+def test_de_builds_on_ds_unless_plan_says_otherwise():
+    """DE waits for the DS plan by default, and only starts alone when declared independent."""
+    tasks, depends_on = orchestrator._read_invocations([
+        {'agent': 'DS', 'task': "Compute sleep averages"},
+        {'agent': 'DE', 'task': "Explain how sleep affects recovery"},
+    ])
+    assert depends_on == {}
+    assert _dispatch({'tasks': tasks, 'depends_on': depends_on}) == ["analysis plan"]
+    assert _dispatch({'tasks': tasks}) == ["analysis plan"]
+
+    tasks, depends_on = orchestrator._read_invocations([
+        {'agent': 'DS', 'task': "Compute sleep averages"},
+        {'agent': 'DE', 'task': "Explain how sleep affects recovery", 'depends_on': []},
+    ])
+    assert depends_on == {'DE': []}
+    assert _dispatch({'tasks': tasks, 'depends_on': depends_on}) == [None]
+
+
+def _plan_from_reply(monkeypatch, reply):
+    """The plan understand_user_need makes from a given Gemini reply."""
+    _record_gemini_calls(monkeypatch, reply)
+    return Orchestrator(None, None, None).understand_user_need("How is my sleep?")
+
+
+def test_plan_given_as_a_bare_invocation_array(monkeypatch):
+    """A top-level JSON array is read as the plan's invocations."""
+    invocations = '[{"agent": "DS", "task": "Average my sleep"}, {"agent": "HC", "task": "Suggest a routine"}]'
+    plan = _plan_from_reply(monkeypatch, f"```json\n{invocations}\n```")
+    assert plan['tasks'] == {'DS': "Average my sleep", 'HC': "Suggest a routine"}
+
+    # Unfenced, only the first invocation object is found; it is no plan on its own
+    plan = _plan_from_reply(monkeypatch, f"Plan: {invocations}")
+    assert plan['main_agent'] == 'HC' and set(plan['tasks']) == {'DE', 'HC'}
+
+
+def test_unusable_plans_fall_back_to_the_default(monkeypatch):
+    """Scalars, plans without agent tasks and malformed tasks all use the default plan."""
+    for reply in ('```json\n"DS"\n```', '```json\n42\n```', '{"main_agent": "DS", "invocations": []}',
+                  '{"tasks": ["DS"]}', '{"tasks": {"DS": ""}}', "no plan here"):
+        plan = _plan_from_reply(monkeypatch, reply)
+        assert plan['main_agent'] == 'HC', reply
+        assert set(plan['tasks']) == {'DE', 'HC'}
+
+
+def _stub_review(agent):
+    """Replace the synthesis, reflection and memory steps, which call Gemini."""
+    agent._finish_query = lambda user_query, orchestration_plan, agent_responses: {
+        'response': "response", 'agent_responses': agent_responses
+    }
+    agent.update_memory = lambda user_query, final_response: None
+
+
+def _run_with_plan(agent, plan, query="How is my sleep?"):
+    """Process a query end to end with a fixed plan and stubbed review steps."""
+    _stub_review(agent)
+    agent.understand_user_need = lambda user_query: plan
+    return agent.process_query(query)
+
+
+def test_speculative_de_is_used_when_the_plan_runs_de_alone():
+    """With speculative=True, DE starts before planning and its answer is kept."""
+    de_agent = FakeDE()
+    agent = Orchestrator(FakeDS(), de_agent, None, speculative=True)
+
+    result = _run_with_plan(agent, {'tasks': {'DE': "Explain sleep stages"}})
+
+    assert result['agent_responses'] == {'DE': "insights"}
+    assert de_agent.ds_analyses == [None]
+
+
+def test_speculative_de_is_replaced_when_de_needs_ds():
+    """A speculative DE call is discarded when the plan makes DE build on DS."""
+    de_agent = FakeDE()
+    agent = Orchestrator(FakeDS(), de_agent, None, speculative=True)
+
+    result = _run_with_plan(agent, {'tasks': {'DS': "Average my sleep", 'DE': "Interpret it"}})
+
+    assert result['agent_responses']['DE'] == "insights"
+    # The speculative call may or may not have run before it was cancelled
+    assert de_agent.ds_analyses.count("analysis plan") == 1
+    assert set(de_agent.ds_analyses) <= {None, "analysis plan"}
+
+
+def test_coaching_follow_up_reuses_the_previous_plan():
+    """With reuse_followup_plans=True, a short follow-up to an HC-led turn is not replanned."""
+    agent = Orchestrator(FakeDS(), FakeDE(), None, reuse_followup_plans=True)
+    _stub_review(agent)
+    planned = []
+
+    def plan(user_query):
+        planned.append(user_query)
+        return {'main_agent': 'HC', 'tasks': {'DE': "Explain habit formation"}}
+
+    agent.understand_user_need = plan
+    for query in ("How do I build an evening routine?", "Maybe after dinner?", "What does my sleep data say?"):
+        agent.process_query(query)
+
+    assert planned == ["How do I build an evening routine?", "What does my sleep data say?"]
+    assert agent.get_conversation_summary()['plans_reused'] == 1
+
+
+def _record_gemini_calls(monkeypatch, reply):
+    """Stub out Gemini for the orchestrator, recording each call's prompts."""
+    calls = []
+
+    def call_gemini(system_prompt, user_prompt, **kwargs):
+        calls.append((system_prompt, user_prompt))
+        return reply
+
+    monkeypatch.setattr(orchestrator, "call_gemini", call_gemini)
+    monkeypatch.setattr(orchestrator, "create_cached_context", lambda *args, **kwargs: None)
+    return calls
+
+
+def test_planning_and_reflection_see_current_memory(monkeypatch):
+    """Memory reaches the prompts as it is now, while the system prompt stays fixed."""
+    calls = _record_gemini_calls(monkeypatch, '{"approved": true}')
+    agent = Orchestrator(None, None, FakeHC())
+    system_prompt = agent.system_prompt
+
+    agent._merge_memory({'goals': ["Run a 10k"]})
+    agent.understand_user_need("How should I train?")
+    agent.reflect_on_response("How should I train?", {}, {}, "Build up slowly.")
+    agent.reset_memory({'goals': ["Sleep 8 hours"]})
+    agent.understand_user_need("How did I sleep?")
+
+    assert [system for system, _ in calls] == [system_prompt] * 3
+    assert "Run a 10k" in calls[0][1] and "Run a 10k" in calls[1][1]
+    assert "Sleep 8 hours" in calls[2][1] and "Run a 10k" not in calls[2][1]
+    assert "Run a 10k" not in system_prompt
+
+
+def test_non_object_review_replies_are_ignored(monkeypatch):
+    """A reflection or memory update that parses to a list or scalar changes nothing."""
+    for reply in ('```json\n["approved"]\n```', '```json\nfalse\n```'):
+        _record_gemini_calls(monkeypatch, reply)
+        agent = Orchestrator(None, None, None)
+
+        reflection = agent.reflect_on_response("How is my sleep?", {}, {}, "Fine.")
+        agent.update_memory("How is my sleep?", "Fine.")
+
+        assert reflection == orchestrator._approved_reflection()
+        assert agent.memory == agent._empty_memory()
+
+
+def test_combined_review_reflects_and_updates_memory_in_one_call(monkeypatch):
+    """With combine_review_calls=True, one Gemini call both reviews the response and updates memory."""
+    calls = _record_gemini_calls(monkeypatch, (
+        '{"reflection": {"approved": true, "issues": [], "suggested_improvements": ""},'
+        ' "memory_update": {"goals": ["Sleep 8 hours"]}}'
+    ))
+    agent = Orchestrator(None, FakeDE(), None, combine_review_calls=True)
+    agent.understand_user_need = lambda user_query: {'main_agent': 'DE', 'tasks': {'DE': "Explain sleep"}}
+
+    result = agent.process_query("How much sleep do I need?")
+
+    assert result['response'] == "insights"
+    assert result['reflection']['approved'] is True
+    assert agent.memory['goals'] == ["Sleep 8 hours"]
+    assert len(calls) == 1
+
+
+def test_combined_review_with_malformed_reflection_is_approved(monkeypatch):
+    """A reflection that is not an object is approved, and the memory update still applies."""
+    for reflection in ('"looks good"', '["approved"]'):
+        _record_gemini_calls(
+            monkeypatch, f'{{"reflection": {reflection}, "memory_update": {{"goals": ["Walk daily"]}}}}'
+        )
+        agent = Orchestrator(None, None, None, combine_review_calls=True)
+
+        assert agent._reflect_and_update_memory("query", {}, {}, "response") == orchestrator._approved_reflection()
+        assert agent.memory['goals'] == ["Walk daily"]
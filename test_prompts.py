@@ -0,0 +1,36 @@
+"""
+Tests that pre-split prompt rendering matches Jinja's.
+"""
+
+import pytest
+
+import prompts
+
+TEMPLATES = {
+    name: value for name, value in vars(prompts).items() if isinstance(value, prompts.Template)
+}
+
+
+@pytest.mark.parametrize("template", TEMPLATES.values(), ids=TEMPLATES.keys())
+def test_render_prompt_matches_jinja(template):
+    names = sorted(prompts._TEMPLATE_VARIABLES[template])
+    values = ["plain text", "multi\nline {{ braces }} {% raw %}", {'goals': ["Sleep"]}, 42, None]
+    kwargs = {name: values[i % len(values)] for i, name in enumerate(names)}
+
+    assert prompts.render_prompt(template, **kwargs) == template.render(**kwargs)
+    # A missing variable renders empty in both
+    partial = dict(list(kwargs.items())[1:])
+    assert prompts.render_prompt(template, **partial) == template.render(**partial)
+
+
+def test_every_template_is_presplit():
+    assert set(TEMPLATES.values()) == set(prompts._PRESPLIT)
+
+
+def test_templates_with_logic_are_rejected():
+    template = prompts._template("{% if flag %}{{ name }}{% endif %}")
+    try:
+        with pytest.raises(ValueError):
+            prompts._presplit(template)
+    finally:
+        del prompts._TEMPLATE_VARIABLES[template]
@@ -4,6 +4,8 @@ Simple test to verify UnifiedAgent structure without API calls.
 
 from unified_agent import UnifiedAgent
 from mock_data import get_mock_user_data
+from json_utils import extract_json
+from collections import deque
 import json
 
 def test_unified_agent_initialization():
@@ -27,7 +29,7 @@ def test_unified_agent_initialization():
     print(f"  - Medications: {agent.memory['medications']}")
 
     # Check conversation history
-    assert isinstance(agent.conversation_history, list)
+    assert isinstance(agent.conversation_history, deque)
     assert len(agent.conversation_history) == 0
     print("✓ Conversation history initialized correctly")
 
@@ -99,19 +101,75 @@ def test_memory_structure():
 
     # Test JSON extraction
     json_text = json.dumps(test_json)
-    extracted = agent._extract_json(json_text)
+    extracted = extract_json(json_text)
     assert extracted['goals'] == ['Improve sleep quality']
     assert extracted['lifestyle']['exercise_frequency'] == '3x per week'
     print("✓ JSON extraction works")
 
     # Test JSON extraction from code blocks
     code_block = f"Here's the data:\n```json\n{json_text}\n```"
-    extracted = agent._extract_json(code_block)
+    extracted = extract_json(code_block)
     assert extracted['goals'] == ['Improve sleep quality']
     print("✓ JSON extraction from code blocks works")
 
     print("\n✅ All memory structure tests passed!\n")
 
+def test_fork():
+    """Test that a forked agent starts its own conversation with the same prompt."""
+    agent = UnifiedAgent(get_mock_user_data())
+    agent.conversation_history.append({'role': 'user', 'content': 'How has my sleep been?'})
+    agent.memory['goals'].append('Improve sleep')
+
+    fork = agent.fork()
+    assert fork.system_prompt is agent.system_prompt
+    assert len(fork.conversation_history) == 0
+    assert fork.memory['goals'] == []
+    assert fork.memory['conditions'] == agent.memory['conditions']
+
+    fork.memory['conditions'].append('Asthma')
+    assert 'Asthma' not in agent.memory['conditions']
+    assert len(agent.conversation_history) == 1
+    print("✓ Forked agent starts a separate conversation")
+
+def test_skip_trivial_memory_updates(monkeypatch):
+    """Test that trivial turns skip the memory call when enabled."""
+    import unified_agent
+
+    prompts = []
+
+    def fake_call_gemini(system_prompt, user_prompt, **kwargs):
+        prompts.append(user_prompt)
+        return '{"goals": ["Sleep 8 hours"]}'
+
+    monkeypatch.setattr(unified_agent, "call_gemini", fake_call_gemini)
+    agent = UnifiedAgent(get_mock_user_data(), skip_trivial_memory_updates=True)
+
+    agent.process_query("thanks, that helps")
+    assert len(prompts) == 1  # The answer only
+    agent.process_query("I want to sleep 8 hours")
+    assert len(prompts) == 3  # The answer and the memory update
+    assert agent.memory['goals'] == ["Sleep 8 hours"]
+    print("✓ Trivial turns skip the memory update")
+
+def test_failed_background_memory_update(monkeypatch):
+    """Test that a failed background memory update doesn't resurface later."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    def fail(user_query, agent_response):
+        raise TypeError("malformed memory update")
+
+    agent = UnifiedAgent(get_mock_user_data(), executor=ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(agent, "update_memory", fail)
+    before = json.loads(json.dumps(agent.memory))
+
+    agent._pending_memory_update = agent.executor.submit(
+        agent._update_memory_in_background, "I want to sleep more", "Sounds good"
+    )
+    agent.flush_memory()
+
+    assert agent.memory == before
+    print("✓ Failed memory update keeps the previous memory")
+
 if __name__ == "__main__":
     print("=" * 60)
     print("UNIFIED AGENT STRUCTURE TESTS")
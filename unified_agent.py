@@ -6,10 +6,46 @@ Data Science, Domain Expert, and Health Coach agents into one unified system.
 Used for comparing multi-agent vs single-agent architectures.
 """
 
-from api_client import call_gemini
-from prompts import UNIFIED_AGENT_PROMPT, UNIFIED_MEMORY_UPDATE_PROMPT, render_prompt
+from api_client import call_gemini, call_gemini_stream, EXTRACTION_MODEL, GeminiAPIError, hash_system_prompt
+from prompts import (
+    UNIFIED_AGENT_PROMPT,
+    render_prompt,
+    render_unified_memory_block,
+    render_unified_memory_update
+)
+from json_utils import dumps_pretty, extract_json
+from memory_utils import MEMORY_LIST_KEYS, index_memory, merge_memory
+import asyncio
+import copy
+import itertools
 import json
-from typing import Dict, Any, List
+import logging
+import re
+from collections import deque
+from concurrent.futures import Executor, Future
+from functools import cached_property
+from typing import Dict, Any, Deque, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Most recent entries per list shown to the memory-update prompt. Older entries are
+# still deduplicated on merge, so the model doesn't need to see them
+_MEMORY_PROMPT_ITEMS = 10
+# A user message mentioning none of these is unlikely to state a new goal, condition,
+# medication, habit, metric, commitment or progress update
+_MEMORY_TRIGGERS = re.compile(
+    r"\bI\b|\bI'|\bmy\b|\bme\b|goal|want|plan|start|stop|quit|try|aim|target|commit|"
+    r"lose|gain|improv|reduc|increas|diagnos|condition|symptom|pain|medic|pill|prescri|"
+    r"\bmg\b|supplement|sleep|exercis|workout|run|walk|diet|eat|drink|alcohol|smok|"
+    r"stress|weight|step|heart|hrv|bmi|blood|pressure|glucose|cholesterol|vitamin|\blab|"
+    r"level|score|track|progress",
+    re.IGNORECASE
+)
+
+
+def _entity_names(entries: List[Any]) -> Tuple[str, ...]:
+    """Names of health-record entries, which may be dicts with a 'name' or plain names."""
+    return tuple(e.get('name', str(e)) if isinstance(e, dict) else e for e in entries)
 
 
 class UnifiedAgent:
@@ -24,7 +60,12 @@ class UnifiedAgent:
     Used as a baseline to compare against the multi-agent system.
     """
 
-    def __init__(self, user_data: Dict[str, Any]):
+    def __init__(
+        self,
+        user_data: Dict[str, Any],
+        executor: Optional[Executor] = None,
+        skip_trivial_memory_updates: bool = False
+    ):
         """
         Initialize the Unified Agent with complete user data.
 
@@ -34,38 +75,77 @@ class UnifiedAgent:
                 - health_context: Health records, conditions, medications
                 - user_profile: Demographics and basic info
                 - lab_results: Lab test results
+            executor: If given, each turn's memory update runs on it in the background
+                instead of before process_query returns
+            skip_trivial_memory_updates: Skip the memory-update call for turns whose
+                user message mentions nothing memory could record, by a keyword check
         """
         self.user_data = user_data
+        self.executor = executor
+        self.skip_trivial_memory_updates = skip_trivial_memory_updates
 
-        # Initialize memory structure (same as Orchestrator)
+        # The last turn's memory update, if it is still running on the executor
+        self._pending_memory_update: Optional[Future] = None
+
+        # Condition and medication names seed every conversation's memory and the
+        # user data summary, so they are normalized once
+        health_records = user_data.get('health_context', {}).get('health_records', {})
+        self._condition_names = _entity_names(health_records.get('conditions', []))
+        self._medication_names = _entity_names(health_records.get('medications', []))
+
+        self.reset_memory()
+
+    def reset_memory(self):
+        """Start a new conversation: rebuild memory from user_data and clear history."""
+        # Don't let the last query's memory update land in the new conversation
+        self.flush_memory()
+
+        # Initialize memory structure (same as Orchestrator), with condition and
+        # medication names for simpler memory format
         self.memory = {
             'goals': [],
-            'conditions': user_data.get('health_context', {}).get('health_records', {}).get('conditions', []),
+            'conditions': list(self._condition_names),
             'lifestyle': {},
-            'medications': user_data.get('health_context', {}).get('health_records', {}).get('medications', []),
+            'medications': list(self._medication_names),
             'key_metrics': [],
             'action_items': [],
             'progress_notes': []
         }
 
-        # Extract condition and medication names for simpler memory format
-        if isinstance(self.memory['conditions'], list) and len(self.memory['conditions']) > 0:
-            if isinstance(self.memory['conditions'][0], dict):
-                self.memory['conditions'] = [c.get('name', str(c)) for c in self.memory['conditions']]
-
-        if isinstance(self.memory['medications'], list) and len(self.memory['medications']) > 0:
-            if isinstance(self.memory['medications'][0], dict):
-                self.memory['medications'] = [m.get('name', str(m)) for m in self.memory['medications']]
+        # Record each list's entries for dedup on merge
+        self._memory_seen = index_memory(self.memory)
+        self._memory_json_text: Optional[str] = None
 
         # Conversation history
-        self.conversation_history: List[Dict[str, str]] = []
+        # Prompts show at most the last 5 turns (user + assistant pairs), so keep no
+        # more than that, counting what falls off for the turn total
+        self.conversation_history: Deque[Dict[str, str]] = deque(maxlen=10)
+        self._history_evicted = 0
+
+    def flush_memory(self):
+        """Wait for the last query's background memory update, if any, to finish."""
+        pending, self._pending_memory_update = self._pending_memory_update, None
+        if pending is not None:
+            pending.result()
+
+    @cached_property
+    def system_prompt(self) -> str:
+        """
+        System prompt with all user data, rendered on first use.
 
-        # Build system prompt with all user data
-        self.system_prompt = self._build_system_prompt()
+        Memory goes in each user prompt instead, so this stays identical across turns
+        and conversations.
+        """
+        return self._build_system_prompt()
+
+    @cached_property
+    def _system_prompt_hash(self) -> bytes:
+        """Response-cache digest of the system prompt, computed once per agent."""
+        return hash_system_prompt(self.system_prompt)
 
     def _build_system_prompt(self) -> str:
         """
-        Build the unified system prompt with all user data and memory.
+        Build the unified system prompt with all user data.
 
         Returns:
             Rendered system prompt string
@@ -75,8 +155,7 @@ class UnifiedAgent:
 
         return render_prompt(
             UNIFIED_AGENT_PROMPT,
-            user_data=user_data_summary,
-            memory=self.memory
+            user_data=user_data_summary
         )
 
     def _format_user_data(self) -> str:
@@ -86,6 +165,11 @@ class UnifiedAgent:
         Returns:
             Formatted user data string
         """
+        return self._user_data_summary
+
+    @cached_property
+    def _user_data_summary(self) -> str:
+        """The summary returned by _format_user_data; user_data doesn't change."""
         sections = []
 
         # User profile
@@ -103,10 +187,8 @@ class UnifiedAgent:
             health_context = self.user_data['health_context']
             health_records = health_context.get('health_records', {})
 
-            conditions = health_records.get('conditions', [])
-            if conditions:
-                cond_names = [c['name'] if isinstance(c, dict) else c for c in conditions]
-                sections.append(f"**Medical Conditions:** {', '.join(cond_names)}")
+            if self._condition_names:
+                sections.append(f"**Medical Conditions:** {', '.join(self._condition_names)}")
 
             medications = health_records.get('medications', [])
             if medications:
@@ -146,13 +228,20 @@ class UnifiedAgent:
         # Lab results
         if 'lab_results' in self.user_data:
             lab_results = self.user_data['lab_results']
+            results = lab_results['results']
+            cholesterol = results['cholesterol_total']
+            ldl = results['ldl_cholesterol']
+            hdl = results['hdl_cholesterol']
+            glucose = results['glucose_fasting']
+            hba1c = results['hba1c']
+            vitamin_d = results['vitamin_d']
             sections.append(f"""**Recent Lab Results ({lab_results.get('last_test_date')}):**
-- Total Cholesterol: {lab_results['results']['cholesterol_total']['value']} {lab_results['results']['cholesterol_total']['unit']}
-- LDL: {lab_results['results']['ldl_cholesterol']['value']} {lab_results['results']['ldl_cholesterol']['unit']}
-- HDL: {lab_results['results']['hdl_cholesterol']['value']} {lab_results['results']['hdl_cholesterol']['unit']}
-- Fasting Glucose: {lab_results['results']['glucose_fasting']['value']} {lab_results['results']['glucose_fasting']['unit']}
-- HbA1c: {lab_results['results']['hba1c']['value']}{lab_results['results']['hba1c']['unit']}
-- Vitamin D: {lab_results['results']['vitamin_d']['value']} {lab_results['results']['vitamin_d']['unit']}""")
+- Total Cholesterol: {cholesterol['value']} {cholesterol['unit']}
+- LDL: {ldl['value']} {ldl['unit']}
+- HDL: {hdl['value']} {hdl['unit']}
+- Fasting Glucose: {glucose['value']} {glucose['unit']}
+- HbA1c: {hba1c['value']}{hba1c['unit']}
+- Vitamin D: {vitamin_d['value']} {vitamin_d['unit']}""")
 
         return "\n\n".join(sections)
 
@@ -169,7 +258,9 @@ class UnifiedAgent:
         if not self.conversation_history:
             return "No previous conversation"
 
-        recent = self.conversation_history[-max_turns * 2:]  # Last N turns (user + assistant)
+        # Last N turns (user + assistant)
+        start = max(0, len(self.conversation_history) - max_turns * 2)
+        recent = itertools.islice(self.conversation_history, start, None)
         formatted = []
 
         for turn in recent:
@@ -181,7 +272,7 @@ class UnifiedAgent:
 
     def _build_user_prompt(self, user_query: str) -> str:
         """
-        Build the user prompt with query and conversation context.
+        Build the user prompt with memory, query and conversation context.
 
         Args:
             user_query: The user's current query
@@ -189,14 +280,19 @@ class UnifiedAgent:
         Returns:
             Formatted user prompt
         """
+        memory_block = render_unified_memory_block(self.memory)
         conversation_context = self._format_conversation_history()
 
         if conversation_context == "No previous conversation":
-            return f"""User Query: {user_query}
+            return f"""{memory_block}
+
+User Query: {user_query}
 
 Please respond to this query by drawing on your data analysis, medical expertise, and coaching skills as appropriate."""
         else:
-            return f"""Conversation History:
+            return f"""{memory_block}
+
+Conversation History:
 {conversation_context}
 
 Current User Query: {user_query}
@@ -219,38 +315,116 @@ Please respond to this query by drawing on your data analysis, medical expertise
                 - updated_memory: Current memory state
                 - conversation_length: Number of turns so far
         """
+        # This turn's prompt carries the memory, so let the last update land first
+        self.flush_memory()
+
         # Single LLM call with full context
         user_prompt = self._build_user_prompt(user_query)
 
         response = call_gemini(
             system_prompt=self.system_prompt,
+            system_prompt_hash=self._system_prompt_hash,
             user_prompt=user_prompt,
             temperature=0.6  # Balanced temperature for conversational + analytical
         )
 
-        # Update memory after response
-        self.update_memory(user_query, response)
+        return self._finish_turn(user_query, response)
+
+    def stream_query(self, user_query: str) -> Iterator[str]:
+        """
+        Streaming variant of process_query that yields the response as it arrives.
+
+        The turn is recorded, and memory updated, once the response has fully arrived.
+
+        Args:
+            user_query: The user's health-related query
+
+        Yields:
+            Successive pieces of the response text
+        """
+        self.flush_memory()
+
+        chunks = []
+        for chunk in call_gemini_stream(
+            system_prompt=self.system_prompt,
+            system_prompt_hash=self._system_prompt_hash,
+            user_prompt=self._build_user_prompt(user_query),
+            temperature=0.6
+        ):
+            chunks.append(chunk)
+            yield chunk
+
+        self._finish_turn(user_query, "".join(chunks))
 
+    def _finish_turn(self, user_query: str, response: str) -> Dict[str, Any]:
+        """Record a completed turn, update memory from it and build the process_query result."""
         # Update conversation history
-        self.conversation_history.append({
-            'role': 'user',
-            'content': user_query
-        })
-        self.conversation_history.append({
-            'role': 'assistant',
-            'content': response
-        })
-
-        # Rebuild system prompt with updated memory for next turn
-        self.system_prompt = self._build_system_prompt()
+        for role, content in (('user', user_query), ('assistant', response)):
+            if len(self.conversation_history) == self.conversation_history.maxlen:
+                self._history_evicted += 1
+            self.conversation_history.append({
+                'role': role,
+                'content': content
+            })
+
+        # Update memory after response. It does not change this turn's response, so
+        # with an executor it runs in the background; the next query waits for it
+        if self.skip_trivial_memory_updates and not _MEMORY_TRIGGERS.search(user_query):
+            pass  # Nothing to extract, e.g. "thanks" or "ok"
+        elif self.executor is None:
+            self.update_memory(user_query, response)
+        else:
+            self._pending_memory_update = self.executor.submit(
+                self._update_memory_in_background, user_query, response
+            )
 
         return {
             'query': user_query,
             'response': response,
             'updated_memory': self.memory,
-            'conversation_length': len(self.conversation_history) // 2
+            'conversation_length': self._total_turns()
         }
 
+    async def aprocess_query(self, user_query: str) -> Dict[str, Any]:
+        """Async variant of process_query (see that method for details)."""
+        return await asyncio.to_thread(self.process_query, user_query)
+
+    @property
+    def _memory_json(self) -> str:
+        """Recent memory as indented JSON for the update prompt, serialized once per change."""
+        if self._memory_json_text is None:
+            recent = {
+                key: value[-_MEMORY_PROMPT_ITEMS:] if key in MEMORY_LIST_KEYS else value
+                for key, value in self.memory.items()
+            }
+            self._memory_json_text = dumps_pretty(recent)
+        return self._memory_json_text
+
+    def fork(self) -> 'UnifiedAgent':
+        """
+        A new agent for the same user, starting its own conversation.
+
+        Cheaper than building an agent from user_data: the copy reuses this agent's
+        rendered system prompt and user data summary. It runs memory updates inline;
+        set its executor to run them in the background.
+
+        Returns:
+            UnifiedAgent with fresh memory and history
+        """
+        self._system_prompt_hash  # Render once here rather than in every fork
+        agent = copy.copy(self)
+        agent.executor = None
+        agent._pending_memory_update = None
+        agent.reset_memory()
+        return agent
+
+    def _update_memory_in_background(self, user_query: str, agent_response: str):
+        """update_memory for the executor: a failure is logged, not re-raised by flush_memory."""
+        try:
+            self.update_memory(user_query, agent_response)
+        except Exception as e:
+            logger.warning("Memory update failed; keeping the previous memory: %s", e)
+
     def update_memory(self, user_query: str, agent_response: str):
         """
         Extract and update memory entities from conversation turn.
@@ -262,68 +436,35 @@ Please respond to this query by drawing on your data analysis, medical expertise
             user_query: The user's query
             agent_response: The agent's response
         """
-        user_prompt = render_prompt(
-            UNIFIED_MEMORY_UPDATE_PROMPT,
+        user_prompt = render_unified_memory_update(
             user_query=user_query,
             agent_response=agent_response,
-            current_memory=json.dumps(self.memory, indent=2)
+            current_memory=self._memory_json
         )
 
-        response = call_gemini(
-            system_prompt="You are a helpful assistant that extracts structured information from conversations.",
-            user_prompt=user_prompt,
-            temperature=0.3  # Lower temperature for structured extraction
-        )
+        try:
+            response = call_gemini(
+                system_prompt="You are a helpful assistant that extracts structured information from conversations.",
+                user_prompt=user_prompt,
+                model=EXTRACTION_MODEL,
+                temperature=0.3  # Lower temperature for structured extraction
+            )
+        except GeminiAPIError:
+            # Keep the existing memory if extraction fails this turn
+            return
 
         # Parse and merge with existing memory
         try:
-            updated_memory = self._extract_json(response)
-
-            # Merge lists (append only new items)
-            for key in ['goals', 'conditions', 'medications', 'key_metrics', 'action_items', 'progress_notes']:
-                if key in updated_memory and isinstance(updated_memory[key], list):
-                    # Add new items that aren't already present
-                    existing = set(str(item) for item in self.memory.get(key, []))
-                    new_items = [item for item in updated_memory[key] if str(item) not in existing]
-                    self.memory[key] = self.memory.get(key, []) + new_items
-
-            # Merge lifestyle dictionary
-            if 'lifestyle' in updated_memory and isinstance(updated_memory['lifestyle'], dict):
-                self.memory['lifestyle'].update(updated_memory['lifestyle'])
-
+            updated_memory = extract_json(response)
+            if merge_memory(self.memory, self._memory_seen, updated_memory):
+                self._memory_json_text = None
         except (json.JSONDecodeError, ValueError):
             # If parsing fails, skip memory update for this turn
             pass
 
-    def _extract_json(self, text: str) -> Dict[str, Any]:
-        """
-        Extract JSON from text that may contain markdown code blocks.
-
-        Args:
-            text: Text potentially containing JSON
-
-        Returns:
-            Parsed JSON dictionary
-        """
-        # Try to find JSON in code blocks first
-        if '```json' in text:
-            start = text.find('```json') + 7
-            end = text.find('```', start)
-            json_text = text[start:end].strip()
-        elif '```' in text:
-            start = text.find('```') + 3
-            end = text.find('```', start)
-            json_text = text[start:end].strip()
-        else:
-            # Try to find JSON object boundaries
-            start = text.find('{')
-            end = text.rfind('}') + 1
-            if start != -1 and end > start:
-                json_text = text[start:end]
-            else:
-                json_text = text
-
-        return json.loads(json_text)
+    def _total_turns(self) -> int:
+        """Number of turns in this conversation, including those no longer in history."""
+        return (self._history_evicted + len(self.conversation_history)) // 2
 
     def get_conversation_summary(self) -> Dict[str, Any]:
         """
@@ -332,8 +473,9 @@ Please respond to this query by drawing on your data analysis, medical expertise
         Returns:
             Dictionary with conversation statistics and memory
         """
+        self.flush_memory()
         return {
-            'total_turns': len(self.conversation_history) // 2,
+            'total_turns': self._total_turns(),
             'memory': self.memory,
-            'recent_conversation': self.conversation_history[-6:] if self.conversation_history else []
+            'recent_conversation': list(self.conversation_history)[-6:]
         }